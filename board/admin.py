@@ -2,6 +2,9 @@ from django.contrib import admin
 
 from config import settings
 from .models import *
+from .search import is_supported, search_post_ids
+
+POST_ADMIN_SEARCH_LIMIT = 1000
 
 
 @admin.register(Board)
@@ -50,6 +53,18 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ['board_id', 'mbti']
     ordering = ['-create_at']
 
+    def get_queryset(self, request):
+        # the list shows the stored excerpt; the change form reads content with one more query
+        return super().get_queryset(request).defer('content')
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term or not is_supported():
+            return super().get_search_results(request, queryset, search_term)
+
+        # title/content through the post_search index, hidden posts included
+        post_ids = search_post_ids(search_term, offset=0, limit=POST_ADMIN_SEARCH_LIMIT, visible_only=False)
+        return queryset.filter(id__in=post_ids), False
+
     def formed_create_at(self, obj: Post):
         return obj.create_at.strftime(settings.DATETIME_FORMAT2)
 
@@ -57,7 +72,7 @@ class PostAdmin(admin.ModelAdmin):
         return obj.title[:5]
 
     def short_content(self, obj: Post):
-        return obj.content[:10]
+        return obj.excerpt[:10]
 
 
 @admin.register(Comment)
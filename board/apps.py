@@ -4,3 +4,25 @@ from django.apps import AppConfig
 class PostConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'board'
+
+    def ready(self):
+        from django.db.models.signals import m2m_changed, post_delete, post_save
+        from board.feed_cache import bump_feed_generation
+        from board.for_me import add_feed_candidates, mark_feed_candidates_stale
+        from board.models import Board, BoardHashtagAssoc, Post
+        from board.search import remove_post_search, sync_post_search
+        from board.taxonomy import bump_taxonomy_version
+        from membership.models import UserInterest
+
+        for model in (Board, BoardHashtagAssoc):
+            post_save.connect(bump_taxonomy_version, sender=model, dispatch_uid=f'taxonomy_save_{model.__name__}')
+            post_delete.connect(bump_taxonomy_version, sender=model, dispatch_uid=f'taxonomy_delete_{model.__name__}')
+
+        post_save.connect(sync_post_search, sender=Post, dispatch_uid='search_save_Post')
+        post_delete.connect(remove_post_search, sender=Post, dispatch_uid='search_delete_Post')
+        post_save.connect(bump_feed_generation, sender=Post, dispatch_uid='feed_save_Post')
+        post_delete.connect(bump_feed_generation, sender=Post, dispatch_uid='feed_delete_Post')
+
+        post_save.connect(add_feed_candidates, sender=Post, dispatch_uid='for_me_save_Post')
+        for through in (UserInterest.mbtis.through, UserInterest.interests.through):
+            m2m_changed.connect(mark_feed_candidates_stale, sender=through, dispatch_uid=f'for_me_m2m_{through.__name__}')
@@ -0,0 +1,249 @@
+import atexit
+import logging
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import F, Sum
+from django.db.models.functions import Greatest
+
+from board.hot import hot_delta
+from board.models import Comment, CommentLikeShard, Post, PostLikeShard
+
+logger = logging.getLogger("django")
+
+
+class PostViewBuffer:
+    """
+    Write-behind buffer for Post.view
+
+    Views are counted in process memory and written back as `F('view') + n` batch updates,
+    every `flush_interval` seconds by a daemon thread, or early once `max_pending` posts are buffered.
+    Every worker flushes its own increments, so the total stays exact across processes.
+    """
+
+    def __init__(self, flush_interval: float = 10, max_pending: int = 1000):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending = defaultdict(int)
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._flusher = None
+        self._flusher_pid = None
+        self._stopped = threading.Event()
+        self._exit_registered = False
+
+    def start(self):
+        """
+        Start the flushing thread of this process, so an idle worker writes its views back too,
+        and write the remaining views back when the process exits.
+        Called by the WSGI/ASGI entry points; management commands and tests flush themselves.
+        """
+        with self._lock:
+            if self._flusher_pid == os.getpid() and self._flusher.is_alive():
+                return
+
+            if not self._exit_registered:
+                # inherited by forked workers, like the buffer itself
+                atexit.register(self.stop)
+                self._exit_registered = True
+            self._flusher_pid = os.getpid()
+            self._stopped = threading.Event()
+            self._flusher = threading.Thread(target=self._run, args=(self._stopped, ), name='post-view-flush', daemon=True)
+            self._flusher.start()
+
+    def stop(self):
+        """
+        Stop the flushing thread and write the remaining views back
+        """
+        self._stopped.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        self.flush()
+
+    def _run(self, stopped: threading.Event):
+        while not stopped.wait(self.flush_interval):
+            try:
+                self.flush()
+            finally:
+                # the thread's own connection, closed or kept as CONN_MAX_AGE says
+                close_old_connections()
+
+    def record(self, post_id: int) -> int:
+        """
+        Count one view of `post_id`. Returns the views of the post not yet written to the database,
+        including this one, so the caller can add them to the value it read.
+        """
+        if self._flusher_pid is not None and self._flusher_pid != os.getpid():
+            # forked from the process that started the thread (gunicorn --preload), threads do not survive a fork
+            self.start()
+
+        with self._lock:
+            self._pending[post_id] += 1
+            unsaved = self._pending[post_id]
+            should_flush = len(self._pending) >= self.max_pending or time.monotonic() - self._last_flush >= self.flush_interval
+
+        if should_flush:
+            self.flush()
+
+        return unsaved
+
+    def flush(self) -> int:
+        """
+        Write buffered views back. One UPDATE per distinct increment, so a flush costs a handful of queries.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(int)
+            self._last_flush = time.monotonic()
+
+        if not pending:
+            return 0
+
+        by_count = defaultdict(list)
+        for post_id, count in pending.items():
+            by_count[count].append(post_id)
+
+        try:
+            with transaction.atomic():
+                for count, post_ids in by_count.items():
+                    Post.objects.filter(id__in=post_ids).update(view=F('view') + count, hot=F('hot') + hot_delta(views=count))
+        except Exception as e:
+            logger.exception('Failed to flush post views')
+            with self._lock:
+                for post_id, count in pending.items():
+                    self._pending[post_id] += count
+            return 0
+
+        return len(pending)
+
+
+post_view_buffer = PostViewBuffer(
+    flush_interval=getattr(settings, 'POST_VIEW_FLUSH_INTERVAL', 10),
+    max_pending=getattr(settings, 'POST_VIEW_MAX_PENDING', 1000),
+)
+
+
+class ShardedLikeCounter:
+    """
+    Like counter of a hot row spread over LIKE_COUNTER_SHARDS slot rows per target
+
+    Each increment lands on a random slot, so concurrent likes of one viral post lock different rows
+    instead of queueing on the post row. `fold` moves the slot totals back into the target column.
+    Readers add the unfolded slots with one SUM query (`overlay`).
+    With LIKE_COUNTER_SHARDS = 0 increments go straight to the target row.
+    `score_field` of the target (Post.hot) gets the like weight whenever likes reach the target row.
+    """
+
+    def __init__(self, target_model, shard_model, target_field: str, score_field: str = None):
+        self.target_model = target_model
+        self.shard_model = shard_model
+        self.target_field = target_field
+        self.score_field = score_field
+
+    def _target_update(self, likes: int) -> dict:
+        update = {'like': F('like') + likes}
+        if self.score_field:
+            # an unlike takes the weight back, never below 0
+            update[self.score_field] = Greatest(F(self.score_field) + hot_delta(likes=likes), 0)
+        return update
+
+    @property
+    def shards(self) -> int:
+        return getattr(settings, 'LIKE_COUNTER_SHARDS', 0)
+
+    def add(self, target_id: int, delta: int):
+        """
+        Add `delta` likes to `target_id`. Runs in the caller's transaction.
+        """
+        if not self.shards:
+            targets = self.target_model.objects.filter(id=target_id)
+            if delta < 0:
+                targets = targets.filter(like__gte=-delta)
+            targets.update(**self._target_update(delta))
+            return
+
+        slot = random.randrange(self.shards)
+        shard = self.shard_model.objects.filter(**{self.target_field: target_id}, slot=slot)
+        if shard.update(like=F('like') + delta):
+            return
+
+        try:
+            with transaction.atomic():
+                self.shard_model.objects.create(**{f'{self.target_field}_id': target_id}, slot=slot, like=delta)
+        except IntegrityError as e:
+            # the slot row was created concurrently
+            shard.update(like=F('like') + delta)
+
+    def pending(self, target_ids) -> dict:
+        """
+        Unfolded likes per target id
+        """
+        if not self.shards:
+            return {}
+
+        rows = (
+            self.shard_model.objects.filter(**{f'{self.target_field}__in': target_ids})
+            .values(self.target_field).annotate(total=Sum('like')).values_list(self.target_field, 'total')
+        )
+        return dict(rows)
+
+    def overlay(self, targets):
+        """
+        Add the unfolded likes to the `like` of loaded targets
+        """
+        targets = list(targets)
+        if not targets:
+            return
+
+        pending = self.pending([target.id for target in targets])
+        for target in targets:
+            target.like = target.like + pending.get(target.id, 0)
+
+    def overlay_rows(self, rows):
+        """
+        overlay for .values() rows with 'id' and 'like'
+        """
+        rows = list(rows)
+        if not rows:
+            return
+
+        pending = self.pending([row['id'] for row in rows])
+        for row in rows:
+            row['like'] = row['like'] + pending.get(row['id'], 0)
+
+    def fold(self) -> int:
+        """
+        Move slot totals into the target column. Slots are decremented by the value read, not reset,
+        so increments landing during the fold are kept for the next one.
+        """
+        with transaction.atomic():
+            rows = list(
+                self.shard_model.objects.select_for_update().exclude(like=0)
+                .values_list('id', self.target_field, 'like')
+            )
+
+            totals = defaultdict(int)
+            shards_by_value = defaultdict(list)
+            for shard_id, target_id, like in rows:
+                totals[target_id] += like
+                shards_by_value[like].append(shard_id)
+
+            targets_by_total = defaultdict(list)
+            for target_id, total in totals.items():
+                if total:
+                    targets_by_total[total].append(target_id)
+
+            for total, target_ids in targets_by_total.items():
+                self.target_model.objects.filter(id__in=target_ids).update(**self._target_update(total))
+            for like, shard_ids in shards_by_value.items():
+                self.shard_model.objects.filter(id__in=shard_ids).update(like=F('like') - like)
+
+        return len(totals)
+
+
+post_like_counter = ShardedLikeCounter(Post, PostLikeShard, 'post_id', score_field='hot')
+comment_like_counter = ShardedLikeCounter(Comment, CommentLikeShard, 'comment_id')
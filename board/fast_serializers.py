@@ -0,0 +1,211 @@
+"""
+Response dicts built straight from .values() rows, for the read endpoints that list posts and comments.
+Each function returns what its DRF serializer returns for the same row, key for key and in the same order:
+
+    serialize_simple_posts  SimplePostSerializer
+    serialize_post_detail   PostDetailSerializer
+    serialize_comments      CommentSerializer
+
+serialize_compact_posts writes the v2 feed, which has no DRF serializer.
+The querysets must be annotated by with_is_liked(). board.tests.FastSerializerParityTest keeps them in step.
+"""
+from operator import itemgetter
+
+from django.conf import settings as django_settings
+from django.utils import timezone
+
+from config import settings
+from membership.models import User
+
+AUTHOR_VALUES = ('user_id', 'user_id__nickname', 'user_id__mbti', 'user_id__image')
+
+SIMPLE_POST_VALUES = (
+    'id', 'board_id__category', 'hashtag_id', 'hashtag_id__text', 'mbti', *AUTHOR_VALUES,
+    'title', 'excerpt', 'view', 'like', 'is_liked', 'comment_count', 'report', 'create_at', 'update_at',
+)
+POST_DETAIL_VALUES = (
+    'id', 'board_id__category', 'hashtag_id__text', 'mbti', *AUTHOR_VALUES,
+    'title', 'content', 'view', 'like', 'is_liked', 'create_at', 'update_at', 'hidden',
+)
+COMMENT_VALUES = (
+    'id', 'content', 'like', 'is_liked', 'report', 'create_at', 'delete_at', *AUTHOR_VALUES,
+    'parent_comment_id', 'depth',
+)
+
+# v2 feed field -> .values() columns; category, topic and author refer to the side dictionaries
+COMPACT_POST_FIELDS = {
+    'id': ('id', ),
+    'category': ('board_id', 'board_id__category'),
+    'topic': ('hashtag_id', 'hashtag_id__text'),
+    'mbti': ('mbti', ),
+    'author': AUTHOR_VALUES,
+    'title': ('title', ),
+    'short_content': ('excerpt', ),
+    'view': ('view', ),
+    'like': ('like', ),
+    'is_liked': ('is_liked', ),
+    'comment_count': ('comment_count', ),
+    'report': ('report', ),
+    'create_at': ('create_at', ),
+    'update_at': ('update_at', ),
+}
+
+
+def datetime_formatter():
+    """
+    DateTimeField(format=DATETIME_FORMAT).to_representation with the timezone looked up once per response
+    """
+    tz = timezone.get_current_timezone() if django_settings.USE_TZ else None
+    fmt = settings.DATETIME_FORMAT
+
+    def format_datetime(value):
+        if not value:
+            return None
+        if tz is not None and value.tzinfo is not None:
+            value = value.astimezone(tz)
+        return value.strftime(fmt)
+
+    return format_datetime
+
+
+def author_builder():
+    """
+    UserSimpleProfileSerializer of the author columns of a row
+    """
+    image_url = User._meta.get_field('image').storage.url
+
+    def build_author(row):
+        if row['user_id'] is None:
+            return None
+        image = row['user_id__image']
+        return {
+            'nickname': row['user_id__nickname'],
+            'mbti': row['user_id__mbti'],
+            'image': image_url(image) if image else None,
+        }
+
+    return build_author
+
+
+def serialize_simple_posts(rows) -> list:
+    format_datetime = datetime_formatter()
+    build_author = author_builder()
+
+    data = []
+    for row in rows:
+        post = {'id': row['id'], 'category': row['board_id__category']}
+        # SimplePostSerializer skips the topic of a post without one
+        if row['hashtag_id'] is not None:
+            post['topic'] = row['hashtag_id__text']
+        post['mbti'] = row['mbti']
+        post['author'] = build_author(row)
+        post['title'] = row['title']
+        post['short_content'] = row['excerpt']
+        post['view'] = row['view']
+        post['like'] = row['like']
+        post['is_liked'] = bool(row['is_liked'])
+        post['comment_count'] = row['comment_count']
+        post['report'] = row['report']
+        post['create_at'] = format_datetime(row['create_at'])
+        post['update_at'] = format_datetime(row['update_at'])
+        data.append(post)
+
+    return data
+
+
+def serialize_post_detail(row) -> dict:
+    format_datetime = datetime_formatter()
+
+    return {
+        'post_id': row['id'],
+        'category': row['board_id__category'],
+        'topic': row['hashtag_id__text'],
+        'mbti': row['mbti'],
+        'author': author_builder()(row),
+        'title': row['title'],
+        'content': row['content'],
+        'view': row['view'],
+        'like': row['like'],
+        'is_liked': bool(row['is_liked']),
+        'create_at': format_datetime(row['create_at']),
+        'update_at': format_datetime(row['update_at']),
+    }
+
+
+def serialize_comments(rows) -> list:
+    format_datetime = datetime_formatter()
+    build_author = author_builder()
+
+    return [
+        {
+            'comment_id': row['id'],
+            'content': row['content'],
+            'like': row['like'],
+            'is_liked': bool(row['is_liked']),
+            'report': row['report'],
+            'create_at': format_datetime(row['create_at']),
+            'delete_at': format_datetime(row['delete_at']),
+            'author': build_author(row),
+            'parent_comment_id': row['parent_comment_id'],
+            'depth': row['depth'],
+        }
+        for row in rows
+    ]
+
+
+def compact_post_values(fields) -> tuple:
+    """
+    .values() columns of the selected v2 feed fields, id always included
+    """
+    columns = dict.fromkeys(COMPACT_POST_FIELDS['id'])
+    for field in fields:
+        columns.update(dict.fromkeys(COMPACT_POST_FIELDS[field]))
+    return tuple(columns)
+
+
+def serialize_compact_posts(rows, fields) -> dict:
+    """
+    v2 feed page: post rows with the selected fields, and every board, topic and author of the page once.
+    A post's category is a board id, its topic a topic id and its author a nickname, keys of
+    'boards', 'topics' and 'authors'.
+    """
+    rows = list(rows)
+    format_datetime = datetime_formatter()
+    getters = {
+        'category': itemgetter('board_id'),
+        'topic': itemgetter('hashtag_id'),
+        'mbti': itemgetter('mbti'),
+        'author': itemgetter('user_id__nickname'),
+        'title': itemgetter('title'),
+        'short_content': itemgetter('excerpt'),
+        'view': itemgetter('view'),
+        'like': itemgetter('like'),
+        'is_liked': lambda row: bool(row['is_liked']),
+        'comment_count': itemgetter('comment_count'),
+        'report': itemgetter('report'),
+        'create_at': lambda row: format_datetime(row['create_at']),
+        'update_at': lambda row: format_datetime(row['update_at']),
+    }
+    selected = [(field, getters[field]) for field in fields if field != 'id']
+
+    data = []
+    for row in rows:
+        post = {'id': row['id']}
+        for field, get in selected:
+            post[field] = get(row)
+        data.append(post)
+
+    page = {'data': data}
+    if 'category' in fields:
+        page['boards'] = {row['board_id']: row['board_id__category'] for row in rows if row['board_id'] is not None}
+    if 'topic' in fields:
+        page['topics'] = {row['hashtag_id']: row['hashtag_id__text'] for row in rows if row['hashtag_id'] is not None}
+    if 'author' in fields:
+        build_author = author_builder()
+        authors = page['authors'] = {}
+        for row in rows:
+            nickname = row['user_id__nickname']
+            if row['user_id'] is not None and nickname not in authors:
+                authors[nickname] = build_author(row)
+
+    return page
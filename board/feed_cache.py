@@ -0,0 +1,75 @@
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+FEED_GENERATION_KEY = 'board:feed:generation:{scope}'
+FEED_PAGE_KEY = 'board:feed:page:{digest}'
+
+
+def _new_generation() -> int:
+    # not 1: a generation key evicted and recreated must not match pages cached under its old values
+    return time.time_ns()
+
+
+def _generation_keys(category, topics) -> list:
+    """
+    Generations a feed depends on: its board, its topics, or every post when it has neither filter
+    """
+    scopes = []
+    if category:
+        scopes.append(f'board:{category}')
+    scopes.extend(f'topic:{topic}' for topic in topics)
+    if not scopes:
+        scopes.append('all')
+
+    return [FEED_GENERATION_KEY.format(scope=scope) for scope in scopes]
+
+
+def feed_page_key(category, topics, filters: tuple) -> str:
+    """
+    Cache key of one feed page. `filters` is the normalized filter and page tuple,
+    the current generations of the board and topics make a write start a fresh key.
+    """
+    keys = _generation_keys(category, topics)
+    generations = cache.get_many(keys)
+
+    missing = {key: _new_generation() for key in keys if key not in generations}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        generations.update(missing)
+
+    raw = json.dumps([filters, [generations[key] for key in keys]], ensure_ascii=False, default=str)
+    return FEED_PAGE_KEY.format(digest=hashlib.md5(raw.encode()).hexdigest())
+
+
+def get_feed_page(key: str):
+    """
+    Cached (post ids, next_cursor) of a feed page, or None
+    """
+    return cache.get(key)
+
+
+def set_feed_page(key: str, post_ids: list, next_cursor=None):
+    cache.set(key, (post_ids, next_cursor), timeout=settings.FEED_CACHE_TTL)
+
+
+def bump_feed_generation(instance, **kwargs):
+    """
+    Signal receiver. A post was created, edited, hidden or deleted; feeds of its board, its topic
+    and the unfiltered feeds start over.
+    """
+    scopes = ['all']
+    if instance.board_id_id:
+        scopes.append(f'board:{instance.board_id.category}')
+    if instance.hashtag_id_id:
+        scopes.append(f'topic:{instance.hashtag_id.text}')
+
+    for scope in scopes:
+        key = FEED_GENERATION_KEY.format(scope=scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _new_generation(), timeout=None)
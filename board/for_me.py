@@ -0,0 +1,203 @@
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from functools import partial
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q, Window
+from django.db.models.functions import RowNumber
+
+from board.models import FeedCandidate, Post, StaleFeed
+from membership.models import UserInterest
+
+logger = logging.getLogger("django")
+
+FAN_OUT_BATCH = 1000  # users given a new post per INSERT
+
+
+def rebuild_feed_candidates(user_ids) -> int:
+    """
+    Replace the `for_me` candidates of `user_ids` with their latest FOR_ME_FEED_SIZE matching posts
+    """
+    interests = UserInterest.objects.filter(user_id__in=user_ids).prefetch_related('mbtis', 'interests')
+
+    created = 0
+    for interest in interests:
+        mbtis = [mbti_class.mbti for mbti_class in interest.mbtis.all()]
+        hashtag_ids = [hashtag.id for hashtag in interest.interests.all()]
+
+        post_ids = []
+        if mbtis or hashtag_ids:
+            post_ids = (
+                Post.objects.filter(hidden=False).filter(Q(mbti__in=mbtis) | Q(hashtag_id__in=hashtag_ids))
+                .order_by('-create_at').values_list('id', flat=True)[:settings.FOR_ME_FEED_SIZE]
+            )
+
+        with transaction.atomic():
+            FeedCandidate.objects.filter(user_id=interest.user_id_id).delete()
+            created += len(FeedCandidate.objects.bulk_create(
+                [FeedCandidate(user_id_id=interest.user_id_id, post_id_id=post_id) for post_id in post_ids],
+            ))
+
+    return created
+
+
+def prune_feed_candidates(user_ids):
+    """
+    Drop the candidates of `user_ids` older than their latest FOR_ME_FEED_SIZE posts
+    """
+    # post ids follow creation order, the (user_id, post_id) unique index serves the window
+    overflow = FeedCandidate.objects.filter(user_id__in=user_ids).annotate(
+        rank=Window(RowNumber(), partition_by=F('user_id'), order_by=F('post_id').desc()),
+    ).filter(rank__gt=settings.FOR_ME_FEED_SIZE).values('id')
+    FeedCandidate.objects.filter(id__in=overflow).delete()
+
+
+def fan_out_post(post_id, mbti: str, hashtag_id):
+    """
+    Add a new post to the `for_me` feed of every user interested in its mbti or topic
+    """
+    matches = Q(mbtis__mbti=mbti)
+    if hashtag_id is not None:
+        # Q(interests=None) would match every user without interest topics
+        matches |= Q(interests=hashtag_id)
+    user_ids = list(
+        UserInterest.objects.filter(matches, user_id__isnull=False).values_list('user_id', flat=True).distinct()
+    )
+
+    for start in range(0, len(user_ids), FAN_OUT_BATCH):
+        batch = user_ids[start:start + FAN_OUT_BATCH]
+        FeedCandidate.objects.bulk_create(
+            [FeedCandidate(user_id_id=user_id, post_id_id=post_id) for user_id in batch],
+            ignore_conflicts=True,
+        )
+        prune_feed_candidates(batch)
+
+
+class FanOutWorker:
+    """
+    Runs post fan outs on a daemon thread, so writing a post does not wait for every interested user
+
+    Started by the WSGI/ASGI entry points, like board.counters.post_view_buffer.
+    Without a started worker (management commands, tests) a fan out runs inline.
+    Fan outs still queued when a worker is killed are lost, `manage.py rebuild_for_me_feeds` restores them.
+    """
+
+    def __init__(self):
+        self._jobs = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._thread_pid = None
+        self._exit_registered = False
+
+    def start(self):
+        """
+        Start the fan out thread of this process, and drain its queue when the process exits
+        """
+        with self._lock:
+            if self._thread_pid == os.getpid() and self._thread.is_alive():
+                return
+
+            if not self._exit_registered:
+                atexit.register(self.stop)
+                self._exit_registered = True
+            self._thread_pid = os.getpid()
+            # a queue inherited through a fork may hold jobs of the parent
+            self._jobs = queue.SimpleQueue()
+            self._thread = threading.Thread(target=self._run, args=(self._jobs, ), name='for-me-fan-out', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """
+        Run the queued fan outs and stop the thread
+        """
+        with self._lock:
+            if self._thread is None or self._thread_pid != os.getpid():
+                return
+            self._jobs.put(None)
+            thread, self._thread, self._thread_pid = self._thread, None, None
+        thread.join()
+
+    def submit(self, post_id, mbti: str, hashtag_id):
+        if self._thread_pid is None:
+            fan_out_post(post_id, mbti, hashtag_id)
+            return
+
+        if self._thread_pid != os.getpid():
+            # forked from the process that started the thread (gunicorn --preload)
+            self.start()
+        self._jobs.put((post_id, mbti, hashtag_id))
+
+    def _run(self, jobs: queue.SimpleQueue):
+        while True:
+            job = jobs.get()
+            if job is None:
+                return
+
+            try:
+                fan_out_post(*job)
+            except Exception as e:
+                logger.exception('Failed to fan out post %s', job[0])
+            finally:
+                # the thread's own connection, closed or kept as CONN_MAX_AGE says
+                close_old_connections()
+
+
+fan_out_worker = FanOutWorker()
+
+
+def add_feed_candidates(instance: Post, created: bool, **kwargs):
+    """
+    Signal receiver. The fan out is queued once the post is committed, outside the transaction writing it.
+    """
+    if not created or instance.hidden:
+        return
+
+    transaction.on_commit(partial(fan_out_worker.submit, instance.pk, instance.mbti, instance.hashtag_id_id))
+
+
+def ensure_feed_candidates(user_id):
+    """
+    Rebuild the candidates of `user_id` if its interests changed since the last rebuild
+    """
+    marked_at = StaleFeed.objects.filter(user_id=user_id).values_list('marked_at', flat=True).first()
+    if marked_at is None:
+        return
+
+    rebuild_feed_candidates([user_id])
+    # an interest change during the rebuild moved the mark, keep it
+    StaleFeed.objects.filter(user_id=user_id, marked_at=marked_at).delete()
+
+
+def mark_feed_candidates_stale(instance, action: str, reverse: bool, pk_set, **kwargs):
+    """
+    Signal receiver. UserInterest mbtis or interests changed.
+    The rebuild waits for the next `for_me` read, so a profile save changing both M2Ms costs nothing here.
+    """
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        user_ids = [instance.user_id_id]
+    elif pk_set:
+        # changed from the MBTIClass / Hashtag side, pk_set are UserInterest ids
+        user_ids = UserInterest.objects.filter(id__in=pk_set).values_list('user_id', flat=True)
+    else:
+        return
+
+    mark_feeds_stale(user_ids)
+
+
+def mark_feeds_stale(user_ids):
+    """
+    Rebuild the candidates of `user_ids` on their next `for_me` read, one upsert
+    """
+    marked_at = time.time_ns()
+    StaleFeed.objects.bulk_create(
+        [StaleFeed(user_id_id=user_id, marked_at=marked_at) for user_id in user_ids],
+        update_conflicts=True, unique_fields=['user_id'], update_fields=['marked_at'],
+    )
@@ -0,0 +1,49 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from board.models import HotScoreDecay, Post
+
+
+def hot_delta(posts: int = 0, views: int = 0, likes: int = 0, comments: int = 0) -> float:
+    """
+    Score added to Post.hot by new activity. Decay makes older activity weigh less.
+    """
+    weights = settings.HOT_SCORE_WEIGHTS
+    return posts * weights['post'] + views * weights['view'] + likes * weights['like'] + comments * weights['comment']
+
+
+def decay_factor(seconds: float) -> float:
+    return 0.5 ** (seconds / settings.HOT_SCORE_HALF_LIFE)
+
+
+def decay_hot_scores(seconds: float) -> int:
+    """
+    Decay every score by `seconds` of half-life. Scores that fell below HOT_SCORE_FLOOR drop to 0,
+    so later runs only rewrite posts with recent activity.
+    """
+    decayed = Post.objects.filter(hot__gt=settings.HOT_SCORE_FLOOR).update(hot=F('hot') * decay_factor(seconds))
+    Post.objects.filter(hot__gt=0, hot__lte=settings.HOT_SCORE_FLOOR).update(hot=0)
+    return decayed
+
+
+def decay_hot_scores_since_last_run() -> tuple:
+    """
+    Decay every score by the time since the previous run, read from HotScoreDecay.
+    Returns (decayed posts, seconds). A late, skipped or overlapping run still decays by the real elapsed time.
+    """
+    with transaction.atomic():
+        # the row lock serializes concurrent runs, the second one decays by the few seconds in between
+        last, created = HotScoreDecay.objects.select_for_update().get_or_create(id=1, defaults={'decayed_at': timezone.now()})
+        if created:
+            return 0, 0.0
+
+        now = timezone.now()
+        seconds = max((now - last.decayed_at).total_seconds(), 0)
+        decayed = decay_hot_scores(seconds)
+
+        last.decayed_at = now
+        last.save(update_fields=['decayed_at'])
+
+    return decayed, seconds
@@ -0,0 +1,77 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections, transaction
+from django.test.utils import override_settings
+
+from board.counters import post_like_counter
+from board.models import Board, LikePostAssoc, Post
+from config.bench import bench_databases
+from membership.models import User
+
+
+class Command(BaseCommand):
+    help = 'Compare like throughput on a single hot post with the post row counter and with sharded like counters'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--likes', type=int, default=2000, help='Likes per run, one per user')
+        parser.add_argument('--workers', type=int, default=16, help='Concurrent likers')
+        parser.add_argument('--shards', type=int, default=16, help='LIKE_COUNTER_SHARDS of the sharded run')
+
+    def handle(self, *args, **options):
+        with bench_databases():
+            User.objects.bulk_create([User(nickname=f'bench-liker-{i}') for i in range(options['likes'])])
+            users = list(User.objects.filter(nickname__startswith='bench-liker-'))
+            board = Board.objects.create(index=0, category='bench-hot-post', hidden=True)
+
+            results = []
+            for shards in (0, options['shards']):
+                post = Post.objects.create(board_id=board, mbti='XXXX', title='hot post', content='hot post', hidden=True)
+                with override_settings(LIKE_COUNTER_SHARDS=shards):
+                    elapsed, retries = self.run(post, users, options['workers'])
+                    post_like_counter.fold()
+
+                post.refresh_from_db(fields=['like'])
+                results.append((shards, elapsed, retries, post.like))
+
+        likes = len(users)
+        self.stdout.write(f"{likes} likes on one post, {options['workers']} workers")
+        for shards, elapsed, retries, like in results:
+            label = f'{shards} shards' if shards else 'post row'
+            self.stdout.write(f"{label:>10}: {elapsed:.2f}s, {likes / elapsed:.1f} likes/s, {retries} lock retries, like={like}")
+
+    def run(self, post, users, workers):
+        retries = 0
+        retries_lock = threading.Lock()
+
+        def like(user):
+            nonlocal retries
+            while True:
+                try:
+                    # LikePost.put
+                    with transaction.atomic():
+                        LikePostAssoc.objects.create(user_id=user, post_id=post)
+                        post_like_counter.add(post.id, 1)
+                    return
+                except OperationalError as e:
+                    # SQLite answers a busy database instead of waiting on row locks
+                    if 'locked' not in str(e):
+                        raise
+                    with retries_lock:
+                        retries += 1
+
+        def like_all(chunk):
+            try:
+                for user in chunk:
+                    like(user)
+            finally:
+                connections.close_all()
+
+        chunks = [users[i::workers] for i in range(workers)]
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(like_all, chunks))
+
+        return time.perf_counter() - started, retries
@@ -0,0 +1,63 @@
+import time
+from io import BytesIO
+
+from django.core.management.base import BaseCommand
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from board.fast_serializers import *
+from board.models import Board, Comment, Post
+from config.bench import bench_databases
+from config.renderers import FastJSONParser, FastJSONRenderer, orjson
+from hashtag.models import Hashtag
+from membership.models import User
+
+
+class Command(BaseCommand):
+    help = 'Compare DRF JSONRenderer/JSONParser with config.renderers on feed and post detail payloads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page-size', type=int, default=20, help='Posts of the feed payload and root comments of the detail payload')
+        parser.add_argument('--repeat', type=int, default=2000, help='Renders and parses per payload')
+
+    def handle(self, *args, **options):
+        page_size = options['page_size']
+        with bench_databases():
+            user = User.objects.create_user(nickname='bench-renderer')
+            board = Board.objects.create(index=0, category='bench-renderer', hidden=True)
+            hashtag = Hashtag.objects.create(text='bench-renderer')
+
+            content = '연애 고민 상담 글입니다. ' * 40
+            Post.objects.bulk_create([
+                Post(board_id=board, hashtag_id=hashtag, user_id=user, mbti='INFP', title=f'글 제목 {i}', content=content, excerpt=content[:50], hidden=True)
+                for i in range(page_size)
+            ])
+            post = Post.objects.filter(board_id=board).first()
+            Comment.objects.bulk_create([Comment(post_id=post, user_id=user, content=f'댓글 {i}', path=f'{i:010d}') for i in range(page_size)])
+
+            # CreateOrGetPost.get and PostDetail.get responses
+            posts = Post.objects.filter(board_id=board).with_is_liked(user)
+            payloads = [
+                ('feed', {'data': serialize_simple_posts(posts.values(*SIMPLE_POST_VALUES)), 'next_cursor': 'WyJjcmVhdGVfYXQiXQ'}),
+                ('post detail', {
+                    'data': serialize_post_detail(posts.values(*POST_DETAIL_VALUES).get(id=post.id)),
+                    'comments': serialize_comments(Comment.objects.filter(post_id=post).with_is_liked(user).values(*COMMENT_VALUES)),
+                    'comments_next_cursor': None,
+                }),
+            ]
+
+        repeat = options['repeat']
+        self.stdout.write(f"orjson {'installed' if orjson else 'NOT installed, stdlib fallback'}, {repeat} runs per payload")
+        for name, payload in payloads:
+            body = JSONRenderer().render(payload)
+            render = self.rate(lambda: JSONRenderer().render(payload), repeat), self.rate(lambda: FastJSONRenderer().render(payload), repeat)
+            parse = self.rate(lambda: JSONParser().parse(BytesIO(body)), repeat), self.rate(lambda: FastJSONParser().parse(BytesIO(body)), repeat)
+            self.stdout.write(f"{name:>12} ({len(body):,} bytes)")
+            self.stdout.write(f"{'render':>12}: DRF {render[0]:,.0f}/s, fast {render[1]:,.0f}/s, x{render[1] / render[0]:.1f}")
+            self.stdout.write(f"{'parse':>12}: DRF {parse[0]:,.0f}/s, fast {parse[1]:,.0f}/s, x{parse[1] / parse[0]:.1f}")
+
+    def rate(self, run, repeat):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            run()
+        return repeat / (time.perf_counter() - started)
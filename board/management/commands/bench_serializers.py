@@ -0,0 +1,72 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from board.fast_serializers import *
+from board.models import Board, Comment, Post
+from board.serializers import CommentSerializer, PostDetailSerializer, SimplePostSerializer
+from config.bench import bench_databases
+from hashtag.models import Hashtag
+from membership.models import User
+
+
+class Command(BaseCommand):
+    help = 'Compare rows per second of the DRF serializers and board.fast_serializers on the same rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000, help='Posts and comments to serialize')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per serializer, the best one is reported')
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        with bench_databases():
+            user = User.objects.create_user(nickname='bench-serializer')
+            board = Board.objects.create(index=0, category='bench-serializer', hidden=True)
+            hashtag = Hashtag.objects.create(text='bench-serializer')
+
+            Post.objects.bulk_create([
+                Post(board_id=board, hashtag_id=hashtag, user_id=user, mbti='INFP', title=f'post {i}', content='content ' * 40, excerpt=('content ' * 40)[:50], hidden=True)
+                for i in range(rows)
+            ])
+            post = Post.objects.filter(board_id=board).first()
+            Comment.objects.bulk_create([Comment(post_id=post, user_id=user, content=f'comment {i}', path=f'{i:010d}') for i in range(rows)])
+
+            posts = Post.objects.filter(board_id=board).with_is_liked(user)
+            comments = Comment.objects.filter(post_id=post).with_is_liked(user)
+            cases = [
+                (
+                    'SimplePostSerializer',
+                    list(posts.select_related('board_id', 'hashtag_id', 'user_id')),
+                    lambda instances: SimplePostSerializer(instances, user_id=user, many=True).data,
+                    list(posts.values(*SIMPLE_POST_VALUES)),
+                    serialize_simple_posts,
+                ),
+                (
+                    'PostDetailSerializer',
+                    list(posts.select_related('board_id', 'hashtag_id', 'user_id')),
+                    lambda instances: [PostDetailSerializer(instance, user_id=user).data for instance in instances],
+                    list(posts.values(*POST_DETAIL_VALUES)),
+                    lambda values: [serialize_post_detail(row) for row in values],
+                ),
+                (
+                    'CommentSerializer',
+                    list(comments.select_related('user_id')),
+                    lambda instances: CommentSerializer(instances, user_id=user, many=True).data,
+                    list(comments.values(*COMMENT_VALUES)),
+                    serialize_comments,
+                ),
+            ]
+
+            self.stdout.write(f"{rows} rows, best of {options['repeat']}")
+            for name, instances, drf, values, fast in cases:
+                drf_rate = rows / self.best(drf, instances, options['repeat'])
+                fast_rate = rows / self.best(fast, values, options['repeat'])
+                self.stdout.write(f"{name:>22}: DRF {drf_rate:,.0f} rows/s, fast {fast_rate:,.0f} rows/s, x{fast_rate / drf_rate:.1f}")
+
+    def best(self, serialize, rows, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            serialize(rows)
+            timings.append(time.perf_counter() - started)
+        return min(timings)
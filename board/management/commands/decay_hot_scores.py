@@ -0,0 +1,21 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from board.hot import decay_hot_scores_since_last_run
+
+
+class Command(BaseCommand):
+    help = 'Decay Post.hot by the time since the last run, stored in the database. Run from cron, or keep running with --every'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--every', type=float, help='Keep decaying every N seconds instead of once')
+
+    def handle(self, *args, **options):
+        while True:
+            decayed, seconds = decay_hot_scores_since_last_run()
+            self.stdout.write(self.style.SUCCESS(f'Decayed hot score of {decayed} posts by {seconds:.0f}s'))
+
+            if not options['every']:
+                break
+            time.sleep(options['every'])
@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from board.counters import comment_like_counter, post_like_counter
+
+
+class Command(BaseCommand):
+    help = 'Fold sharded like counters back into Post.like and Comment.like. Run periodically when LIKE_COUNTER_SHARDS > 0'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--every', type=float, help='Keep folding every N seconds instead of once')
+
+    def handle(self, *args, **options):
+        while True:
+            posts = post_like_counter.fold()
+            comments = comment_like_counter.fold()
+            self.stdout.write(self.style.SUCCESS(f'Folded likes of {posts} posts and {comments} comments'))
+
+            if not options['every']:
+                break
+            time.sleep(options['every'])
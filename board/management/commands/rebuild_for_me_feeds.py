@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from board.for_me import rebuild_feed_candidates
+from membership.models import UserInterest
+
+
+class Command(BaseCommand):
+    help = 'Rebuild `for_me` feed candidates from UserInterest. Run once after migrating'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, nargs='*', help='Only rebuild these user ids')
+
+    def handle(self, *args, **options):
+        user_ids = options['user'] or list(UserInterest.objects.filter(user_id__isnull=False).values_list('user_id', flat=True))
+
+        created = 0
+        for start in range(0, len(user_ids), 500):
+            created += rebuild_feed_candidates(user_ids[start:start + 500])
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {created} feed candidates of {len(user_ids)} users'))
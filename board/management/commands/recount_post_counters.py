@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from board.models import Comment, CommentLikeShard, LikeCommentAssoc, LikePostAssoc, Post, PostLikeShard
+
+
+def _count_of(queryset, group_by):
+    """
+    Correlated COUNT subquery over `queryset` grouped by `group_by`, 0 when there are no rows
+    """
+    counts = queryset.order_by().values(group_by).annotate(count=Count('id')).values('count')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def live_comment_count():
+    return _count_of(Comment.objects.filter(post_id=OuterRef('pk'), delete_at__isnull=True), 'post_id')
+
+
+def post_like_count():
+    return _count_of(LikePostAssoc.objects.filter(post_id=OuterRef('pk')), 'post_id')
+
+
+def comment_like_count():
+    return _count_of(LikeCommentAssoc.objects.filter(comment_id=OuterRef('pk')), 'comment_id')
+
+
+class Command(BaseCommand):
+    help = 'Recompute denormalized counters (Post.comment_count, Post.like, Comment.like) from their source rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--post', type=int, nargs='*', help='Only recount these post ids and their comments')
+
+    def handle(self, *args, **options):
+        posts = Post.objects.all()
+        comments = Comment.objects.all()
+        if options['post']:
+            posts = posts.filter(id__in=options['post'])
+            comments = comments.filter(post_id__in=options['post'])
+
+        # recounted likes include the unfolded like shards, drop them in the same transaction
+        with transaction.atomic():
+            updated = posts.update(comment_count=live_comment_count(), like=post_like_count())
+            PostLikeShard.objects.filter(post_id__in=posts).delete()
+        self.stdout.write(self.style.SUCCESS(f'Recounted comment_count and like of {updated} posts'))
+
+        with transaction.atomic():
+            updated = comments.update(like=comment_like_count())
+            CommentLikeShard.objects.filter(comment_id__in=comments).delete()
+        self.stdout.write(self.style.SUCCESS(f'Recounted like of {updated} comments'))
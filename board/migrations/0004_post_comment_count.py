@@ -0,0 +1,29 @@
+# Generated by Django 4.2.3 on 2026-10-18 10:00
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_comment_count(apps, schema_editor):
+    Post = apps.get_model('board', 'Post')
+    Comment = apps.get_model('board', 'Comment')
+
+    comments = Comment.objects.filter(post_id=OuterRef('pk'), delete_at__isnull=True).order_by().values('post_id').annotate(count=Count('id')).values('count')
+    Post.objects.update(comment_count=Coalesce(Subquery(comments, output_field=IntegerField()), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('board', '0003_magazine'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_comment_count, migrations.RunPython.noop),
+    ]
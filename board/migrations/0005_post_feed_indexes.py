@@ -0,0 +1,64 @@
+# Generated by Django 4.2.3 on 2026-10-18 11:20
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('board', '0004_post_comment_count'),
+        ('hashtag', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('hidden', False)), fields=['-create_at', '-id'], name='post_feed_create_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('hidden', False)), fields=['-view', '-id'], name='post_feed_view_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('hidden', False)), fields=['-like', '-id'], name='post_feed_like_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('hidden', False)), fields=['board_id', '-create_at', '-id'], name='post_board_create_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('hidden', False)), fields=['board_id', '-view', '-id'], name='post_board_view_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('hidden', False)), fields=['board_id', '-like', '-id'], name='post_board_like_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('hidden', False)), fields=['hashtag_id', '-create_at', '-id'], name='post_topic_create_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('hidden', False)), fields=['hashtag_id', '-view', '-id'], name='post_topic_view_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('hidden', False)), fields=['hashtag_id', '-like', '-id'], name='post_topic_like_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('hidden', False)), fields=['mbti', '-create_at', '-id'], name='post_mbti_create_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('hidden', False)), fields=['mbti', '-view', '-id'], name='post_mbti_view_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('hidden', False)), fields=['mbti', '-like', '-id'], name='post_mbti_like_idx'),
+        ),
+    ]
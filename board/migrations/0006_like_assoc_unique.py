@@ -0,0 +1,34 @@
+# Generated by Django 4.2.3 on 2026-10-18 12:05
+
+from django.db import migrations, models
+from django.db.models import Min, Count
+
+
+def delete_duplicate_likes(apps, schema_editor):
+    for model_name, target in (('LikePostAssoc', 'post_id'), ('LikeCommentAssoc', 'comment_id')):
+        model = apps.get_model('board', model_name)
+        duplicates = (
+            model.objects.filter(user_id__isnull=False, **{f'{target}__isnull': False})
+            .values('user_id', target).annotate(keep=Min('id'), rows=Count('id')).filter(rows__gt=1)
+        )
+        for row in duplicates:
+            model.objects.filter(user_id=row['user_id'], **{target: row[target]}).exclude(id=row['keep']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('board', '0005_post_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicate_likes, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='likepostassoc',
+            constraint=models.UniqueConstraint(fields=('user_id', 'post_id'), name='like_post_assoc_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='likecommentassoc',
+            constraint=models.UniqueConstraint(fields=('user_id', 'comment_id'), name='like_comment_assoc_unique'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.3 on 2026-10-18 16:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('board', '0006_like_assoc_unique'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CommentLikeShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('slot', models.PositiveSmallIntegerField()),
+                ('like', models.IntegerField(default=0)),
+                ('comment_id', models.ForeignKey(db_column='comment_id', on_delete=django.db.models.deletion.CASCADE, related_name='like_shard_set', to='board.comment')),
+            ],
+            options={
+                'db_table': 'comment_like_shard',
+                'constraints': [models.UniqueConstraint(fields=('comment_id', 'slot'), name='comment_like_shard_unique')],
+            },
+        ),
+        migrations.CreateModel(
+            name='PostLikeShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('slot', models.PositiveSmallIntegerField()),
+                ('like', models.IntegerField(default=0)),
+                ('post_id', models.ForeignKey(db_column='post_id', on_delete=django.db.models.deletion.CASCADE, related_name='like_shard_set', to='board.post')),
+            ],
+            options={
+                'db_table': 'post_like_shard',
+                'constraints': [models.UniqueConstraint(fields=('post_id', 'slot'), name='post_like_shard_unique')],
+            },
+        ),
+    ]
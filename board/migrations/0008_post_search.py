@@ -0,0 +1,30 @@
+# Generated by Django 4.2.3 on 2026-10-18 17:10
+
+from django.db import migrations
+
+from board.search import create_search_table, drop_search_table, index_rows
+
+
+def create_post_search(apps, schema_editor):
+    create_search_table(schema_editor)
+
+    Post = apps.get_model('board', 'Post')
+    posts = Post.objects.order_by('id').values_list('id', 'title', 'content')
+    with schema_editor.connection.cursor() as cursor:
+        for start in range(0, posts.count(), 1000):
+            index_rows(cursor, list(posts[start:start + 1000]))
+
+
+def drop_post_search(apps, schema_editor):
+    drop_search_table(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('board', '0007_like_shards'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_post_search, drop_post_search),
+    ]
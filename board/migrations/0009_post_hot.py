@@ -0,0 +1,56 @@
+# Generated by Django 4.2.3 on 2026-10-18 17:40
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_hot(apps, schema_editor):
+    """
+    Existing posts: all of their activity counted as if it happened when the post was created
+    """
+    Post = apps.get_model('board', 'Post')
+    weights = settings.HOT_SCORE_WEIGHTS
+    now = timezone.now()
+
+    posts = []
+    for post in Post.objects.only('id', 'view', 'like', 'comment_count', 'create_at').iterator(chunk_size=1000):
+        activity = weights['post'] + post.view * weights['view'] + post.like * weights['like'] + post.comment_count * weights['comment']
+        hot = activity * 0.5 ** ((now - post.create_at).total_seconds() / settings.HOT_SCORE_HALF_LIFE)
+        if hot > settings.HOT_SCORE_FLOOR:
+            post.hot = hot
+            posts.append(post)
+
+    Post.objects.bulk_update(posts, ['hot'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('board', '0008_post_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='hot',
+            field=models.FloatField(default=0),
+        ),
+        migrations.RunPython(backfill_hot, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('hidden', False)), fields=['-hot', '-id'], name='post_feed_hot_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('hidden', False)), fields=['board_id', '-hot', '-id'], name='post_board_hot_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('hidden', False)), fields=['hashtag_id', '-hot', '-id'], name='post_topic_hot_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('hidden', False)), fields=['mbti', '-hot', '-id'], name='post_mbti_hot_idx'),
+        ),
+    ]
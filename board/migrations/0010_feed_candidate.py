@@ -0,0 +1,28 @@
+# Generated by Django 4.2.3 on 2026-10-18 18:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('board', '0009_post_hot'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedCandidate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('post_id', models.ForeignKey(db_column='post_id', on_delete=django.db.models.deletion.CASCADE, related_name='feed_candidate_set', to='board.post')),
+                ('user_id', models.ForeignKey(db_column='user_id', on_delete=django.db.models.deletion.CASCADE, related_name='feed_candidate_set', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'feed_candidate',
+                'constraints': [models.UniqueConstraint(fields=('user_id', 'post_id'), name='feed_candidate_unique')],
+            },
+        ),
+    ]
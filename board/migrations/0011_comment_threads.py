@@ -0,0 +1,75 @@
+# Generated by Django 4.2.3 on 2026-10-18 19:10
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+COMMENT_PATH_DIGITS = 10
+COMMENT_MAX_DEPTH = 20
+
+
+def backfill_paths(apps, schema_editor):
+    """
+    Path and depth of the existing comments, from their parent chains.
+    A reply deeper than COMMENT_MAX_DEPTH, which can no longer be written, is placed next to its parent
+    so the path fits max_length; parent_comment_id is kept.
+    """
+    Comment = apps.get_model('board', 'Comment')
+    parents = dict(Comment.objects.values_list('id', 'parent_comment_id'))
+    paths = {}
+
+    def path_of(comment_id):
+        # walked up iteratively, a long parent chain must not hit the recursion limit
+        chain = []
+        while comment_id is not None and comment_id not in paths:
+            chain.append(comment_id)
+            comment_id = parents.get(comment_id)
+
+        path = '' if comment_id is None else paths[comment_id]
+        for comment_id in reversed(chain):
+            path = path[:COMMENT_MAX_DEPTH * COMMENT_PATH_DIGITS] + f'{comment_id:0{COMMENT_PATH_DIGITS}d}'
+            paths[comment_id] = path
+        return path
+
+    comments = []
+    for comment in Comment.objects.only('id').iterator(chunk_size=1000):
+        comment.path = path_of(comment.id)
+        comment.depth = len(comment.path) // COMMENT_PATH_DIGITS - 1
+        comments.append(comment)
+
+    Comment.objects.bulk_update(comments, ['path', 'depth'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('board', '0010_feed_candidate'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='path',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='comment',
+            name='parent_comment_id',
+            field=models.ForeignKey(blank=True, db_column='parent_comment_id', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reply_set', to='board.comment', verbose_name='parent comment'),
+        ),
+        migrations.RunPython(backfill_paths, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post_id', 'depth', 'path'], name='comment_root_path_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post_id', 'path'], name='comment_thread_path_idx'),
+        ),
+    ]
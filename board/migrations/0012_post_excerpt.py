@@ -0,0 +1,25 @@
+# Generated by Django 4.2.3 on 2026-10-18 19:40
+
+from django.db import migrations, models
+from django.db.models.functions import Substr
+
+
+def backfill_excerpt(apps, schema_editor):
+    Post = apps.get_model('board', 'Post')
+    Post.objects.update(excerpt=Substr('content', 1, 50))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('board', '0011_comment_threads'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='excerpt',
+            field=models.CharField(blank=True, default='', editable=False, max_length=50),
+        ),
+        migrations.RunPython(backfill_excerpt, migrations.RunPython.noop),
+    ]
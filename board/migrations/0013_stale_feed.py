@@ -0,0 +1,26 @@
+# Generated by Django 4.2.3 on 2026-10-18 21:10
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('board', '0012_post_excerpt'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StaleFeed',
+            fields=[
+                ('user_id', models.OneToOneField(db_column='user_id', on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stale_feed', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('marked_at', models.BigIntegerField()),
+            ],
+            options={
+                'db_table': 'stale_feed',
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.3 on 2026-10-18 21:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('board', '0013_stale_feed'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HotScoreDecay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('decayed_at', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'hot_score_decay',
+            },
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 4.2.3 on 2026-10-18 21:05
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('board', '0014_hot_score_decay'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='post',
+            name='post_feed_view_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='post',
+            name='post_feed_like_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='post',
+            name='post_board_view_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='post',
+            name='post_board_like_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='post',
+            name='post_topic_view_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='post',
+            name='post_topic_like_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='post',
+            name='post_mbti_create_at_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='post',
+            name='post_mbti_view_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='post',
+            name='post_mbti_like_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='post',
+            name='post_mbti_hot_idx',
+        ),
+    ]
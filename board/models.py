@@ -1,7 +1,8 @@
 import os
 
 from django.core.validators import RegexValidator, MinLengthValidator, MaxLengthValidator
-from django.db import models
+from django.db import connections, models
+from django.db.models import Exists, OuterRef
 
 from hashtag.models import Hashtag
 from membership.models import User
@@ -96,6 +97,17 @@ class Penalty(models.Model):
         return f"{self.user_id} ({self.start_at} - {self.end_at}) {self.report_id}"
 
 
+POST_EXCERPT_LENGTH = 50
+
+
+class PostQuerySet(models.QuerySet):
+    def with_is_liked(self, user):
+        """
+        Annotate `is_liked` for `user` so a whole page resolves its liked state in the same query
+        """
+        return self.annotate(is_liked=Exists(LikePostAssoc.objects.filter(post_id=OuterRef('pk'), user_id=user)))
+
+
 class Post(models.Model):
     board_id = models.ForeignKey(Board, on_delete=models.SET_NULL, null=True, blank=True, db_column='board_id', related_name='post_set', verbose_name='board category')
     hashtag_id = models.ForeignKey(Hashtag, on_delete=models.SET_NULL, null=True, blank=True, db_column='hashtag_id', related_name='post_set', verbose_name='subTopic')
@@ -103,22 +115,46 @@ class Post(models.Model):
     mbti = models.CharField(max_length=4, validators=[RegexValidator(regex=r"[IEX][SNX][TFX][PJX]", message='Not match MBTI characters')], null=False, blank=False, verbose_name='written by')
     title = models.CharField(max_length=50, null=False)
     content = models.TextField(null=False, blank=False, validators=[MinLengthValidator(5)])
+    # head of content for lists, which defer('content')
+    excerpt = models.CharField(max_length=POST_EXCERPT_LENGTH, default='', blank=True, editable=False)
     view = models.PositiveIntegerField(default=0)
     like = models.PositiveIntegerField(default=0)
     report = models.PositiveIntegerField(default=0)
+    comment_count = models.PositiveIntegerField(default=0)
+    hot = models.FloatField(default=0)
     hidden = models.BooleanField(default=False, null=False)
     create_at = models.DateTimeField(auto_now_add=True, editable=False)
     update_at = models.DateTimeField(auto_now=True)
     delete_at = models.DateTimeField(null=True, blank=True)
     reserve_at = models.DateTimeField(null=True, blank=True)
 
+    objects = PostQuerySet.as_manager()
+
     class Meta:
         db_table = 'post'
         ordering = ('-create_at', )
+        # feed: visible posts, all or of a board or topic, in the create_at and hot orders. Every index is rewritten
+        # by the writes of its columns, so the view and like orders (cached, FEED_CACHE_TTL) and the mbti filter go without
+        indexes = [
+            models.Index(fields=['-create_at', '-id'], condition=models.Q(hidden=False), name='post_feed_create_at_idx'),
+            models.Index(fields=['-hot', '-id'], condition=models.Q(hidden=False), name='post_feed_hot_idx'),
+            models.Index(fields=['board_id', '-create_at', '-id'], condition=models.Q(hidden=False), name='post_board_create_at_idx'),
+            models.Index(fields=['board_id', '-hot', '-id'], condition=models.Q(hidden=False), name='post_board_hot_idx'),
+            models.Index(fields=['hashtag_id', '-create_at', '-id'], condition=models.Q(hidden=False), name='post_topic_create_at_idx'),
+            models.Index(fields=['hashtag_id', '-hot', '-id'], condition=models.Q(hidden=False), name='post_topic_hot_idx'),
+        ]
 
     def __str__(self):
         return f"#{self.id}({self.board_id}/{self.hashtag_id})"
 
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields', None)
+        if 'content' not in self.get_deferred_fields() and (update_fields is None or 'content' in update_fields):
+            self.excerpt = self.content[:POST_EXCERPT_LENGTH]
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'excerpt'}
+        super().save(*args, **kwargs)
+
 
 class Magazine(models.Model):
     hashtag_id = models.ForeignKey(Hashtag, on_delete=models.SET_NULL, null=True, blank=True, db_column='hashtag_id', related_name='magazine_set', verbose_name='magazine')
@@ -135,6 +171,18 @@ class Magazine(models.Model):
     reserve_at = models.DateTimeField(null=True, blank=True)
 
 
+COMMENT_PATH_DIGITS = 10
+COMMENT_MAX_DEPTH = 20  # path max_length 255 / COMMENT_PATH_DIGITS, minus the root
+
+
+class CommentQuerySet(models.QuerySet):
+    def with_is_liked(self, user):
+        """
+        Annotate `is_liked` for `user` so a comment list resolves its liked state in the same query
+        """
+        return self.annotate(is_liked=Exists(LikeCommentAssoc.objects.filter(comment_id=OuterRef('pk'), user_id=user)))
+
+
 class Comment(models.Model):
     user_id = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, db_column='user_id', related_name='comment_set')
     content = models.TextField(null=False, validators=[MaxLengthValidator(200)])
@@ -144,22 +192,71 @@ class Comment(models.Model):
     create_at = models.DateTimeField(auto_now_add=True, editable=False)
     delete_at = models.DateTimeField(null=True, blank=True)
     post_id = models.ForeignKey(Post, on_delete=models.SET_NULL, null=True, blank=True, db_column='post_id', related_name='comment_set')
-    parent_comment_id = models.OneToOneField('self', on_delete=models.SET_NULL, null=True, blank=True, db_column='parent_comment_id', related_name='parent_comment', verbose_name='parent comment')
+    parent_comment_id = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, db_column='parent_comment_id', related_name='reply_set', verbose_name='parent comment')
+    # materialized path: ids of the root ... this comment, COMMENT_PATH_DIGITS zero padded digits each
+    path = models.CharField(max_length=255, default='', blank=True, editable=False)
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
+
+    objects = CommentQuerySet.as_manager()
 
     class Meta:
         db_table = 'comment'
+        # threads: roots of a post in path order, then the path range of a page of roots
+        indexes = [
+            models.Index(fields=['post_id', 'depth', 'path'], name='comment_root_path_idx'),
+            models.Index(fields=['post_id', 'path'], name='comment_thread_path_idx'),
+        ]
 
     def __str__(self):
         return f"{self.id}"
 
+    def build_path(self) -> str:
+        """
+        Path of this saved comment; the parent path must be set already
+        """
+        segment = f'{self.id:0{COMMENT_PATH_DIGITS}d}'
+        if self.parent_comment_id is None:
+            return segment
+        return self.parent_comment_id.path + segment
+
+
+class LikeQuerySet(models.QuerySet):
+    def insert_or_ignore(self, **values) -> bool:
+        """
+        INSERT ... ON CONFLICT DO NOTHING on the unique (user, target) constraint of the like model.
+        False when the like already exists; any other failure (e.g. a deleted user) raises.
+        """
+        like = self.model(**values)
+        connection = connections[self.db]
+        quote_name = connection.ops.quote_name
+
+        fields = [field for field in self.model._meta.concrete_fields if not field.primary_key]
+        conflict = [self.model._meta.get_field(name).column for name in self.model._meta.constraints[0].fields]
+        sql = 'INSERT INTO {} ({}) VALUES ({}) ON CONFLICT ({}) DO NOTHING'.format(
+            quote_name(self.model._meta.db_table),
+            ', '.join(quote_name(field.column) for field in fields),
+            ', '.join(['%s'] * len(fields)),
+            ', '.join(quote_name(column) for column in conflict),
+        )
+        params = [field.get_db_prep_save(getattr(like, field.attname), connection) for field in fields]
+
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.rowcount == 1
+
 
 class LikePostAssoc(models.Model):
     user_id = models.ForeignKey(User, on_delete=models.SET_NULL, db_column='user_id', null=True, blank=True, related_name='like_post_assoc_set')
     post_id = models.ForeignKey(Post, on_delete=models.SET_NULL, null=True, blank=True, db_column='post_id', related_name='like_post_assoc_set')
 
+    objects = LikeQuerySet.as_manager()
+
     class Meta:
         db_table = 'like_post_assoc'
         verbose_name = 'like post'
+        constraints = [
+            models.UniqueConstraint(fields=['user_id', 'post_id'], name='like_post_assoc_unique'),
+        ]
 
     def __str__(self):
         return f"{self.user_id} likes {self.post_id}"
@@ -169,9 +266,79 @@ class LikeCommentAssoc(models.Model):
     user_id = models.ForeignKey(User, on_delete=models.SET_NULL, db_column='user_id', null=True, blank=True, related_name='like_comment_assoc_set')
     comment_id = models.ForeignKey(Comment, on_delete=models.SET_NULL, null=True, blank=True, db_column='comment_id', related_name='like_comment_assoc_set')
 
+    objects = LikeQuerySet.as_manager()
+
     class Meta:
         db_table = 'like_comment_assoc'
         verbose_name = 'like comment'
+        constraints = [
+            models.UniqueConstraint(fields=['user_id', 'comment_id'], name='like_comment_assoc_unique'),
+        ]
 
     def __str__(self):
         return f"{self.user_id} likes {self.comment_id}"
+
+
+class PostLikeShard(models.Model):
+    """
+    One slot of a sharded Post.like counter, folded back into Post.like by `fold_like_shards`
+    """
+    post_id = models.ForeignKey(Post, on_delete=models.CASCADE, db_column='post_id', related_name='like_shard_set')
+    slot = models.PositiveSmallIntegerField()
+    like = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'post_like_shard'
+        constraints = [
+            models.UniqueConstraint(fields=['post_id', 'slot'], name='post_like_shard_unique'),
+        ]
+
+
+class CommentLikeShard(models.Model):
+    """
+    One slot of a sharded Comment.like counter, folded back into Comment.like by `fold_like_shards`
+    """
+    comment_id = models.ForeignKey(Comment, on_delete=models.CASCADE, db_column='comment_id', related_name='like_shard_set')
+    slot = models.PositiveSmallIntegerField()
+    like = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'comment_like_shard'
+        constraints = [
+            models.UniqueConstraint(fields=['comment_id', 'slot'], name='comment_like_shard_unique'),
+        ]
+
+
+class FeedCandidate(models.Model):
+    """
+    Post in the `for_me` feed of a user: its mbti or topic is one of the user's interests
+    """
+    user_id = models.ForeignKey(User, on_delete=models.CASCADE, db_column='user_id', related_name='feed_candidate_set')
+    post_id = models.ForeignKey(Post, on_delete=models.CASCADE, db_column='post_id', related_name='feed_candidate_set')
+
+    class Meta:
+        db_table = 'feed_candidate'
+        constraints = [
+            models.UniqueConstraint(fields=['user_id', 'post_id'], name='feed_candidate_unique'),
+        ]
+
+
+class StaleFeed(models.Model):
+    """
+    User whose interests changed at `marked_at` (time.time_ns()), its `for_me` candidates are rebuilt on the next read
+    """
+    user_id = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, db_column='user_id', related_name='stale_feed')
+    marked_at = models.BigIntegerField()
+
+    class Meta:
+        db_table = 'stale_feed'
+
+
+class HotScoreDecay(models.Model):
+    """
+    Single row: time Post.hot was last decayed to, so each decay covers exactly the time since the previous one
+    """
+    decayed_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'hot_score_decay'
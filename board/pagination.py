@@ -0,0 +1,128 @@
+import base64
+import json
+import math
+from datetime import datetime
+
+from django.conf import settings
+from django.db.models import Q
+from django.db.models.functions import Left
+
+from board.models import COMMENT_PATH_DIGITS
+
+
+# feed `order` query value -> Post column used as the keyset sort key
+CURSOR_ORDER_FIELDS = {
+    'create': 'create_at',
+    'view': 'view',
+    'like': 'like',
+    'hot': 'hot',
+}
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def encode_cursor(order_field: str, post) -> str:
+    """
+    Opaque token holding the sort key and id of the last post of a page, a Post or a .values() row
+    """
+    if isinstance(post, dict):
+        value, post_id = post[order_field], post['id']
+    else:
+        value, post_id = getattr(post, order_field), post.id
+    if isinstance(value, datetime):
+        value = value.isoformat()
+
+    raw = json.dumps([order_field, value, post_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def _is_number(value) -> bool:
+    # json booleans are ints in python, NaN and Infinity never match a row
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+
+def decode_cursor(order_field: str, cursor: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        field, value, post_id = json.loads(raw)
+        if field == 'create_at':
+            value = datetime.fromisoformat(value)
+        elif not _is_number(value):
+            raise ValueError(value)
+        if not _is_number(post_id) or not isinstance(post_id, int):
+            raise ValueError(post_id)
+    except Exception as e:
+        raise InvalidCursor('Invalid cursor')
+
+    if field != order_field:
+        raise InvalidCursor('cursor does NOT match order')
+
+    return value, post_id
+
+
+def paginate_by_cursor(posts, order_field: str, cursor: str, page_size: int):
+    """
+    Keyset pagination over `posts` ordered by (order_field, id) descending.
+    Seeks past the cursor instead of OFFSET and never counts the queryset.
+
+    Returns (page, next_cursor). next_cursor is None on the last page.
+    """
+    posts = posts.order_by(f'-{order_field}', '-id')
+
+    if cursor:
+        value, post_id = decode_cursor(order_field, cursor)
+        posts = posts.filter(Q(**{f'{order_field}__lt': value}) | Q(**{order_field: value, 'id__lt': post_id}))
+
+    # one extra row tells whether another page exists
+    page = list(posts[:page_size + 1])
+    if len(page) <= page_size:
+        return page, None
+
+    page = page[:page_size]
+    return page, encode_cursor(order_field, page[-1])
+
+
+def encode_comment_cursor(root_path: str) -> str:
+    return base64.urlsafe_b64encode(root_path.encode()).decode().rstrip('=')
+
+
+def decode_comment_cursor(cursor: str) -> str:
+    try:
+        root_path = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+    except Exception as e:
+        raise InvalidCursor('Invalid cursor')
+
+    if not root_path.isdigit():
+        raise InvalidCursor('Invalid cursor')
+
+    return root_path
+
+
+def paginate_comment_threads(comments, cursor: str, page_size: int = None):
+    """
+    Keyset pagination over the root comments of `comments` (one post), oldest first,
+    COMMENT_PAGE_SIZE roots unless `page_size` is given.
+    A page holds its roots with all of their replies in path order, so every reply follows its parent.
+
+    Returns (page, next_cursor). next_cursor is None on the last page.
+    """
+    page_size = page_size or settings.COMMENT_PAGE_SIZE
+    roots = comments.filter(depth=0).order_by('path')
+    if cursor:
+        roots = roots.filter(path__gt=decode_comment_cursor(cursor))
+
+    # one extra root tells whether another page exists and bounds the path range of this page
+    root_paths = list(roots.values_list('path', flat=True)[:page_size + 1])
+    if not root_paths:
+        return [], None
+
+    # the replies of a root share its path as prefix and sort between it and the next root,
+    # so do the replies of a hidden root: the root segment keeps them out of the previous thread
+    threads = comments.filter(path__gte=root_paths[0]).alias(root_path=Left('path', COMMENT_PATH_DIGITS)).order_by('path')
+    if len(root_paths) <= page_size:
+        return list(threads.filter(root_path__in=root_paths)), None
+
+    page = list(threads.filter(path__lt=root_paths[page_size], root_path__in=root_paths[:page_size]))
+    return page, encode_comment_cursor(root_paths[page_size - 1])
@@ -0,0 +1,150 @@
+import re
+import unicodedata
+
+from django.db import connection
+from django.db.models import Q
+
+# Hangul syllables and jamo, CJK ideographs: no spaces inside words worth splitting on, indexed as bigrams
+CJK = 'ᄀ-ᇿ㄰-㆏가-힣一-鿿'
+_WORD_RE = re.compile(rf'[{CJK}]+|[^\W{CJK}]+')
+_CJK_RE = re.compile(rf'[{CJK}]')
+
+
+def tokenize(text: str) -> list:
+    """
+    Korean/CJK runs as overlapping character bigrams, other words whole.
+    '연애고민 MBTI' -> ['연애', '애고', '고민', 'mbti']
+    """
+    tokens = []
+    for word in _WORD_RE.findall(unicodedata.normalize('NFKC', text or '').lower()):
+        if _CJK_RE.match(word) and len(word) > 1:
+            tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+        else:
+            tokens.append(word)
+    return tokens
+
+
+def _is_prefix(token: str) -> bool:
+    # a bigram is matched exactly, a single character or latin word also matches longer tokens
+    return not (len(token) == 2 and _CJK_RE.match(token))
+
+
+def is_supported() -> bool:
+    return connection.vendor in ('sqlite', 'postgresql')
+
+
+def create_search_table(schema_editor):
+    """
+    post_search: FTS5 table on SQLite, tsvector with a GIN index on PostgreSQL.
+    Title tokens weigh more than content tokens in the rank.
+    """
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute("CREATE VIRTUAL TABLE post_search USING fts5(title, content, tokenize = 'unicode61')")
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            "CREATE TABLE post_search ("
+            "post_id bigint PRIMARY KEY REFERENCES post (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+            "document tsvector NOT NULL)"
+        )
+        schema_editor.execute("CREATE INDEX post_search_document_idx ON post_search USING gin (document)")
+
+
+def drop_search_table(schema_editor):
+    if schema_editor.connection.vendor in ('sqlite', 'postgresql'):
+        schema_editor.execute("DROP TABLE IF EXISTS post_search")
+
+
+def index_rows(cursor, rows):
+    """
+    Insert or replace the index rows of (post id, title, content)
+    """
+    rows = [(post_id, ' '.join(tokenize(title)), ' '.join(tokenize(content))) for post_id, title, content in rows]
+    if not rows:
+        return
+
+    vendor = cursor.db.vendor
+    if vendor == 'sqlite':
+        cursor.executemany("DELETE FROM post_search WHERE rowid = %s", [(row[0], ) for row in rows])
+        cursor.executemany("INSERT INTO post_search (rowid, title, content) VALUES (%s, %s, %s)", rows)
+    elif vendor == 'postgresql':
+        cursor.executemany(
+            "INSERT INTO post_search (post_id, document) "
+            "VALUES (%s, setweight(to_tsvector('simple', %s), 'A') || setweight(to_tsvector('simple', %s), 'B')) "
+            "ON CONFLICT (post_id) DO UPDATE SET document = EXCLUDED.document",
+            rows,
+        )
+
+
+def index_post(post):
+    if is_supported():
+        with connection.cursor() as cursor:
+            index_rows(cursor, [(post.id, post.title, post.content)])
+
+
+def unindex_post(post_id: int):
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM post_search WHERE rowid = %s", [post_id])
+    # PostgreSQL rows go with the post, ON DELETE CASCADE
+
+
+def search_post_ids(query: str, offset: int, limit: int, visible_only: bool = True) -> list:
+    """
+    Ids of the posts matching every token of `query`, best match first
+    """
+    tokens = tokenize(query)
+    if not tokens:
+        return []
+
+    hidden = "AND post.hidden = %s " if visible_only else ""
+    hidden_params = [False] if visible_only else []
+
+    if connection.vendor == 'sqlite':
+        match = ' '.join(f'"{token}"*' if _is_prefix(token) else f'"{token}"' for token in tokens)
+        sql = (
+            "SELECT post_search.rowid FROM post_search JOIN post ON post.id = post_search.rowid "
+            f"WHERE post_search MATCH %s {hidden}"
+            "ORDER BY bm25(post_search, 2.0, 1.0), post_search.rowid DESC LIMIT %s OFFSET %s"
+        )
+        params = [match, *hidden_params, limit, offset]
+    elif connection.vendor == 'postgresql':
+        match = ' & '.join(f"'{token}':*" if _is_prefix(token) else f"'{token}'" for token in tokens)
+        sql = (
+            "SELECT post_search.post_id FROM post_search JOIN post ON post.id = post_search.post_id, "
+            "to_tsquery('simple', %s) query "
+            f"WHERE post_search.document @@ query {hidden}"
+            "ORDER BY ts_rank(post_search.document, query) DESC, post_search.post_id DESC LIMIT %s OFFSET %s"
+        )
+        params = [match, *hidden_params, limit, offset]
+    else:
+        # no index on this database, scan
+        from board.models import Post
+
+        posts = Post.objects.all()
+        if visible_only:
+            posts = posts.filter(hidden=False)
+        for token in query.split():
+            posts = posts.filter(Q(title__icontains=token) | Q(content__icontains=token))
+        return list(posts.order_by('-create_at').values_list('id', flat=True)[offset:offset + limit])
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def sync_post_search(instance, update_fields=None, **kwargs):
+    """
+    Signal receiver. Post created or title/content edited.
+    """
+    if update_fields is not None and not {'title', 'content'} & set(update_fields):
+        return
+
+    index_post(instance)
+
+
+def remove_post_search(instance, **kwargs):
+    """
+    Signal receiver. Post deleted.
+    """
+    unindex_post(instance.id)
@@ -32,7 +32,6 @@ class SimplePostSerializer(serializers.ModelSerializer):
     topic = serializers.CharField(source='hashtag_id.text', read_only=True)
     author = UserSimpleProfileSerializer(source='user_id', read_only=True)
     is_liked = serializers.BooleanField(read_only=True)
-    comment_count = serializers.SerializerMethodField(read_only=True)
 
     short_content = serializers.SerializerMethodField(read_only=True)
     create_at = serializers.DateTimeField(format=settings.DATETIME_FORMAT)
@@ -45,22 +44,17 @@ class SimplePostSerializer(serializers.ModelSerializer):
     def to_representation(self, instance: Post):
         data = super().to_representation(instance)
 
-        try:
-            instance.like_post_assoc_set.get(user_id=self.user_id_value)
-            data['is_liked'] = True
-        except Exception as e:
-            data['is_liked'] = False
+        # annotated by Post.objects.with_is_liked(), otherwise look up a single instance
+        if not hasattr(instance, 'is_liked'):
+            data['is_liked'] = instance.like_post_assoc_set.filter(user_id=self.user_id_value).exists()
 
         return data
 
     def get_category(self, obj: Post):
         return obj.board_id.category
 
-    def get_comment_count(self, obj: Post):
-        return obj.comment_set.count()
-
     def get_short_content(self, obj):
-        return obj.content[:50]
+        return obj.excerpt
 
     class Meta:
         model = Post
@@ -87,18 +81,16 @@ class CommentSerializer(serializers.ModelSerializer):
     def to_representation(self, instance: Comment):
         data = super().to_representation(instance)
 
-        try:
-            instance.like_comment_assoc_set.get(user_id=self.user_id_value)
-            data['is_liked'] = True
-        except Exception as e:
-            data['is_liked'] = False
+        # annotated by Comment.objects.with_is_liked(), otherwise look up a single instance
+        if not hasattr(instance, 'is_liked'):
+            data['is_liked'] = instance.like_comment_assoc_set.filter(user_id=self.user_id_value).exists()
 
         return data
 
 
     class Meta:
         model = Comment
-        fields = ('comment_id', 'content', 'like', 'is_liked', 'report', 'create_at', 'delete_at', 'author', 'parent_comment_id')
+        fields = ('comment_id', 'content', 'like', 'is_liked', 'report', 'create_at', 'delete_at', 'author', 'parent_comment_id', 'depth')
 
 
 class PostDetailSerializer(serializers.ModelSerializer):
@@ -119,11 +111,9 @@ class PostDetailSerializer(serializers.ModelSerializer):
     def to_representation(self, instance: Post):
         data = super().to_representation(instance)
 
-        try:
-            instance.like_post_assoc_set.get(user_id=self.user_id_value)
-            data['is_liked'] = True
-        except Exception as e:
-            data['is_liked'] = False
+        # annotated by Post.objects.with_is_liked(), otherwise look up a single instance
+        if not hasattr(instance, 'is_liked'):
+            data['is_liked'] = instance.like_post_assoc_set.filter(user_id=self.user_id_value).exists()
 
         return data
 
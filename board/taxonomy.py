@@ -0,0 +1,61 @@
+import hashlib
+import json
+import threading
+import time
+
+from django.core.cache import cache
+from django.db.models import Prefetch
+
+from board.models import Board, BoardHashtagAssoc
+from board.serializers import BoardSerializer
+
+TAXONOMY_VERSION_KEY = 'board:taxonomy:version'
+
+_lock = threading.Lock()
+_taxonomy = (None, None, None)  # (version, etag, data)
+
+
+def get_taxonomy_version() -> int:
+    # a clock value, so a version key lost to eviction never comes back as an older version
+    return cache.get_or_set(TAXONOMY_VERSION_KEY, time.time_ns, timeout=None)
+
+
+def bump_taxonomy_version(**kwargs):
+    """
+    Signal receiver. Invalidates every process holding the board taxonomy.
+    """
+    try:
+        cache.incr(TAXONOMY_VERSION_KEY)
+    except ValueError:
+        cache.set(TAXONOMY_VERSION_KEY, time.time_ns(), timeout=None)
+
+
+def build_taxonomy():
+    """
+    Boards with their topics, loaded with one prefetch query instead of a query per board and topic
+    """
+    boards = Board.objects.prefetch_related(
+        Prefetch('hashtag_assoc_set', queryset=BoardHashtagAssoc.objects.select_related('hashtag_id')),
+    )
+    return BoardSerializer(boards, many=True).data
+
+
+def get_taxonomy():
+    """
+    Returns (etag, data) of the board taxonomy, rebuilt only when the version key was bumped
+    """
+    global _taxonomy
+
+    version = get_taxonomy_version()
+    cached_version, etag, data = _taxonomy
+    if cached_version == version:
+        return etag, data
+
+    with _lock:
+        cached_version, etag, data = _taxonomy
+        if cached_version != version:
+            data = build_taxonomy()
+            etag = '"%s"' % hashlib.md5(json.dumps(data, ensure_ascii=False, sort_keys=True).encode()).hexdigest()
+            _taxonomy = (version, etag, data)
+
+        return etag, data
@@ -1,3 +1,1012 @@
-from django.test import TestCase
+import base64
+import importlib.util
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO
+from itertools import product
+from unittest.mock import patch
 
-# Create your tests here.
+from django.apps import apps as django_apps
+from django.core.cache import cache
+from django.db import IntegrityError, OperationalError, connection, connections
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.exceptions import ErrorDetail, ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+import board.counters
+from board.counters import PostViewBuffer, comment_like_counter, post_like_counter, post_view_buffer
+from board.fast_serializers import *
+from board.for_me import FanOutWorker, fan_out_post
+from board.hot import decay_factor, decay_hot_scores, decay_hot_scores_since_last_run, hot_delta
+from board.taxonomy import TAXONOMY_VERSION_KEY, bump_taxonomy_version, get_taxonomy_version
+from board.models import *
+from board.search import index_post, tokenize
+from config.renderers import FastJSONParser, FastJSONRenderer
+from board.serializers import CommentSerializer, PostDetailSerializer, SimplePostSerializer
+from hashtag.models import Hashtag
+from mbti.models import MBTIClass
+from membership.models import User, UserInterest
+
+
+class PostFeedQueryPlanTest(TestCase):
+    """
+    Every CreateOrGetPost.get filter combination in the create and hot orders should be served by an index on `post`
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(nickname='planner')
+        cls.boards = [Board.objects.create(index=i, category=f'board{i}') for i in range(3)]
+        cls.hashtags = [Hashtag.objects.create(text=f'topic{i}') for i in range(6)]
+        mbtis = ['INTP', 'ENFJ', 'ISTJ', 'ESFP']
+
+        Post.objects.bulk_create([
+            Post(
+                board_id=cls.boards[i % 3], hashtag_id=cls.hashtags[i % 6], user_id=cls.user, mbti=mbtis[i % 4],
+                title=f'title{i}', content='content' * 10, view=i % 17, like=i % 11, hidden=i % 10 == 0,
+            )
+            for i in range(600)
+        ])
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def full_scans(self, sql):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute(f'EXPLAIN {sql}')
+                return [row[0] for row in cursor.fetchall() if 'Seq Scan on post ' in row[0]]
+
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return [row[-1] for row in cursor.fetchall() if row[-1].startswith('SCAN post') and 'INDEX' not in row[-1]]
+
+    def assert_no_full_scan(self, params):
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get('/boards/posts/', params)
+        self.assertEqual(res.status_code, 200, params)
+
+        for query in ctx.captured_queries:
+            if 'FROM "post"' in query['sql']:
+                self.assertEqual(self.full_scans(query['sql']), [], f'{params}\n{query["sql"]}')
+
+        return res.json()
+
+    def test_feed_filters_use_index(self):
+        mbtis = ['', 'intp']
+        topics = ['', 'topic1', 'topic1,topic2']
+        categories = ['', 'board1']
+        # view and like pages are served from the feed cache, their columns are not indexed
+        orders = ['', 'create', 'hot']
+
+        for mbti, topic, category, order in product(mbtis, topics, categories, orders):
+            params = {'mbti': mbti, 'topic': topic, 'category': category, 'order': order, 'pageSize': 5}
+
+            self.assert_no_full_scan({**params, 'pageNum': 3})
+
+            data = self.assert_no_full_scan({**params, 'cursor': ''})
+            if data['next_cursor']:
+                self.assert_no_full_scan({**params, 'cursor': data['next_cursor']})
+
+
+class PostCursorTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(nickname='reader'))
+
+    def test_tampered_cursor_is_rejected(self):
+        def cursor(*raw):
+            return base64.urlsafe_b64encode(json.dumps(raw).encode()).decode().rstrip('=')
+
+        tampered = [
+            ('view', cursor('view', 'abc', 1)),
+            ('view', cursor('view', [1], 1)),
+            ('hot', cursor('hot', {'a': 1}, 1)),
+            ('like', cursor('like', True, 1)),
+            ('view', cursor('view', 1, '1')),
+            ('view', cursor('view', 1, 1.5)),
+            ('view', cursor('view', 1, None)),
+            ('create', cursor('create_at', 5, 1)),
+            ('view', 'not a cursor'),
+        ]
+        for order, value in tampered:
+            res = self.client.get('/boards/posts/', {'order': order, 'cursor': value})
+            self.assertEqual(res.status_code, 400, (order, value))
+
+        res = self.client.get('/boards/posts/', {'order': 'hot', 'cursor': cursor('hot', 1.5, 10)})
+        self.assertEqual(res.status_code, 200)
+
+
+class FeedQueryCountTest(TestCase):
+    """
+    A feed page and a post detail cost a fixed number of queries, whatever the authors, topics, likes and comments on them
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(nickname='reader')
+        authors = [User.objects.create_user(nickname=f'author{i}') for i in range(10)]
+        cls.board = Board.objects.create(index=0, category='board')
+        hashtags = [Hashtag.objects.create(text=f'topic{i}') for i in range(5)]
+
+        cls.posts = Post.objects.bulk_create([
+            Post(board_id=cls.board, hashtag_id=hashtags[i % 5], user_id=authors[i % 10], mbti='INFP', title=f'title{i}', content='content')
+            for i in range(50)
+        ])
+        LikePostAssoc.objects.bulk_create([LikePostAssoc(user_id=cls.user, post_id=post) for post in cls.posts[::2]])
+
+        comments = []
+        for post in cls.posts:
+            for i in range(3):
+                root = cls.comment(post, authors[i])
+                comments += [root, cls.comment(post, authors[i + 1], parent=root)]
+        LikeCommentAssoc.objects.bulk_create([LikeCommentAssoc(user_id=cls.user, comment_id=comment) for comment in comments[::3]])
+
+    @staticmethod
+    def comment(post, author, parent=None):
+        comment = Comment.objects.create(post_id=post, user_id=author, parent_comment_id=parent, content='comment', depth=0 if parent is None else parent.depth + 1)
+        comment.path = comment.build_path()
+        comment.save(update_fields=['path'])
+        return comment
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        # post detail views are buffered per post id, which the next test reuses
+        self.addCleanup(post_view_buffer.flush)
+
+    def test_feed_page_of_50_posts(self):
+        # board, COUNT of the paginator, page rows with author, topic and is_liked joined in
+        with self.assertNumQueries(3):
+            res = self.client.get('/boards/posts/', {'category': 'board', 'pageSize': 50, 'pageNum': 1})
+        self.assertEqual(len(res.json()['data']), 50)
+        self.assertEqual(sum(post['is_liked'] for post in res.json()['data']), 25)
+
+        # board, page rows
+        with self.assertNumQueries(2):
+            res = self.client.get('/boards/posts/', {'category': 'board', 'pageSize': 50, 'cursor': ''})
+        self.assertEqual(len(res.json()['data']), 50)
+
+    @override_settings(COMMENT_PAGE_SIZE=20)
+    def test_post_detail_with_comments(self):
+        post = self.posts[0]
+        for i in range(20):
+            self.comment(post, self.user, parent=self.comment(post, self.user))
+
+        # post with author, topic and is_liked, roots of the first comment page, the threads of those roots
+        with self.assertNumQueries(3):
+            res = self.client.get(f'/boards/posts/{post.id}/')
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(res.json()['data']['is_liked'])
+        self.assertEqual(len(res.json()['comments']), 40)
+        self.assertEqual(sum(comment['is_liked'] for comment in res.json()['comments']), 2)
+
+
+class LikeConcurrencyTest(TransactionTestCase):
+    """
+    Concurrent like/unlike taps must leave the like counters equal to the association rows
+    """
+
+    def setUp(self):
+        self.users = [User.objects.create_user(nickname=f'liker{i}') for i in range(8)]
+        board = Board.objects.create(index=0, category='board')
+        self.post = Post.objects.create(board_id=board, user_id=self.users[0], mbti='INTP', title='title', content='content')
+        self.comment = Comment.objects.create(user_id=self.users[0], post_id=self.post, content='comment')
+
+    def hammer(self, url, methods, rounds=10):
+        """
+        Two threads per user tap `url` at the same time, each cycling through `methods`
+        """
+        barrier = threading.Barrier(len(self.users) * 2)
+
+        def tap(user):
+            client = APIClient()
+            client.force_authenticate(user)
+            barrier.wait()
+            try:
+                for i in range(rounds):
+                    method = methods[i % len(methods)]
+                    while True:
+                        try:
+                            res = getattr(client, method)(url)
+                        except OperationalError as e:
+                            # the in-memory SQLite test database locks whole tables instead of waiting
+                            if 'locked' not in str(e):
+                                raise
+                            continue
+                        # the same lock error caught by the view's post/comment lookup
+                        if res.status_code != 400 or 'locked' not in res.data.get('msg', ''):
+                            break
+            finally:
+                connections.close_all()
+
+        with ThreadPoolExecutor(max_workers=len(self.users) * 2) as executor:
+            for future in [executor.submit(tap, user) for user in self.users * 2]:
+                future.result()
+
+    def refresh(self, target):
+        # sharded likes count once folded
+        post_like_counter.fold()
+        comment_like_counter.fold()
+        target.refresh_from_db()
+
+    def test_post_like_counter_matches_rows(self):
+        url = f'/boards/posts/{self.post.id}/like/'
+
+        self.hammer(url, ['put'])
+        self.refresh(self.post)
+        self.assertEqual(LikePostAssoc.objects.filter(post_id=self.post).count(), len(self.users))
+        self.assertEqual(self.post.like, len(self.users))
+
+        self.hammer(url, ['delete', 'put'], rounds=9)
+        self.refresh(self.post)
+        self.assertEqual(self.post.like, LikePostAssoc.objects.filter(post_id=self.post).count())
+
+    def test_comment_like_counter_matches_rows(self):
+        url = f'/boards/comments/{self.comment.id}/like/'
+
+        self.hammer(url, ['put'])
+        self.refresh(self.comment)
+        self.assertEqual(LikeCommentAssoc.objects.filter(comment_id=self.comment).count(), len(self.users))
+        self.assertEqual(self.comment.like, len(self.users))
+
+        self.hammer(url, ['delete', 'put'], rounds=9)
+        self.refresh(self.comment)
+        self.assertEqual(self.comment.like, LikeCommentAssoc.objects.filter(comment_id=self.comment).count())
+
+    def test_only_a_second_like_is_already_liked(self):
+        client = APIClient()
+        client.force_authenticate(self.users[1])
+        for url in (f'/boards/posts/{self.post.id}/like/', f'/boards/comments/{self.comment.id}/like/'):
+            self.assertEqual(client.put(url).status_code, 201)
+            res = client.put(url)
+            self.assertEqual(res.status_code, 200)
+            self.assertIn('already liked', res.json()['msg'])
+
+        # a foreign key failure is not a like
+        gone = User.objects.create_user(nickname='gone')
+        client.force_authenticate(gone)
+        User.objects.filter(id=gone.id).delete()
+        for url in (f'/boards/posts/{self.post.id}/like/', f'/boards/comments/{self.comment.id}/like/'):
+            with self.assertRaises(IntegrityError):
+                client.put(url)
+
+
+@override_settings(LIKE_COUNTER_SHARDS=4)
+class ShardedLikeConcurrencyTest(LikeConcurrencyTest):
+    """
+    Same taps with likes spread over 4 slots per post and comment
+    """
+
+    def test_unfolded_likes_are_read_from_shards(self):
+        self.hammer(f'/boards/posts/{self.post.id}/like/', ['put'], rounds=1)
+
+        self.assertEqual(Post.objects.get(id=self.post.id).like, 0)
+        self.assertLessEqual(PostLikeShard.objects.filter(post_id=self.post).count(), 4)
+
+        Post.objects.filter(id=self.post.id).update(hashtag_id=Hashtag.objects.create(text='hot'))
+        client = APIClient()
+        client.force_authenticate(self.users[0])
+        res = client.get(f'/boards/posts/{self.post.id}/')
+        self.assertEqual(res.json()['data']['like'], len(self.users))
+
+        self.assertEqual(post_like_counter.fold(), 1)
+        self.assertEqual(Post.objects.get(id=self.post.id).like, len(self.users))
+        self.assertEqual(post_like_counter.pending([self.post.id]), {self.post.id: 0})
+
+
+class PostViewBufferTest(TransactionTestCase):
+    def setUp(self):
+        user = User.objects.create_user(nickname='viewer')
+        board = Board.objects.create(index=0, category='board')
+        self.post = Post.objects.create(board_id=board, user_id=user, mbti='INTP', title='title', content='content')
+
+    def test_idle_buffer_is_flushed(self):
+        buffer = PostViewBuffer(flush_interval=0.05, max_pending=1000)
+        buffer.start()
+        self.addCleanup(buffer.stop)
+
+        for _ in range(3):
+            buffer.record(self.post.id)
+
+        def views():
+            try:
+                return Post.objects.get(id=self.post.id).view
+            except OperationalError as e:
+                # the in-memory SQLite test database locks the table while the flushing thread writes
+                if 'locked' not in str(e):
+                    raise
+                return None
+
+        # no further record() call, the flushing thread writes the views back
+        deadline = time.monotonic() + 5
+        while views() != 3 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.assertEqual(Post.objects.get(id=self.post.id).view, 3)
+
+    def test_stop_flushes_remaining_views(self):
+        buffer = PostViewBuffer(flush_interval=60, max_pending=1000)
+        buffer.start()
+        buffer.record(self.post.id)
+
+        buffer.stop()
+        self.assertEqual(Post.objects.get(id=self.post.id).view, 1)
+
+    def test_exit_flush_is_registered_by_start_only(self):
+        # importing the module (test runner, management commands) must not flush at exit, after the test database is gone
+        spec = importlib.util.spec_from_file_location('board_counters_import', board.counters.__file__)
+        with patch('atexit.register') as register:
+            spec.loader.exec_module(importlib.util.module_from_spec(spec))
+        register.assert_not_called()
+
+        buffer = PostViewBuffer(flush_interval=60, max_pending=1000)
+        with patch('board.counters.atexit.register') as register:
+            buffer.start()
+            self.addCleanup(buffer.stop)
+            buffer.start()
+        register.assert_called_once_with(buffer.stop)
+
+
+class PostSearchTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(nickname='searcher')
+        self.board = Board.objects.create(index=0, category='board')
+        self.topic = Hashtag.objects.create(text='topic')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_post(self, title, content, **kwargs):
+        return Post.objects.create(board_id=self.board, hashtag_id=self.topic, user_id=self.user, mbti='INFP', title=title, content=content, **kwargs)
+
+    def search(self, q, **params):
+        res = self.client.get('/boards/posts/search/', {'q': q, **params})
+        self.assertEqual(res.status_code, 200)
+        return res.json()['data']
+
+    def test_created_post_is_written_and_indexed_once(self):
+        with CaptureQueriesContext(connection) as ctx, patch('board.search.index_post', wraps=index_post) as index:
+            res = self.client.put('/boards/posts/', {'category': 'board', 'topic': 'topic', 'mbti': 'INFP', 'title': '연애 고민', 'content': 'content'}, format='json')
+        self.assertEqual(res.status_code, 201)
+
+        self.assertEqual(index.call_count, 1)
+        writes = [query['sql'] for query in ctx.captured_queries if query['sql'].startswith(('INSERT INTO "post"', 'UPDATE "post"'))]
+        self.assertEqual(len(writes), 1, writes)
+        self.assertEqual([p['id'] for p in self.search('연애')], [res.json()['data']['post_id']])
+
+    def test_korean_text_is_indexed_as_bigrams(self):
+        self.assertEqual(tokenize('연애고민 MBTI 궁합!'), ['연애', '애고', '고민', 'mbti', '궁합'])
+
+        post = self.create_post('연애 고민 있어요', 'ENFP 남자친구랑 자꾸 싸워요')
+        self.create_post('오늘 점심 메뉴', '김치찌개 먹었어요')
+
+        self.assertEqual([p['id'] for p in self.search('연애')], [post.id])
+        self.assertEqual([p['id'] for p in self.search('남자친구 enfp')], [post.id])
+        self.assertEqual([p['id'] for p in self.search('친구랑')], [post.id])
+        # single characters and latin words match as prefixes
+        self.assertEqual([p['id'] for p in self.search('싸')], [post.id])
+        self.assertEqual(self.search('연애 점심'), [])
+
+    def test_results_are_ranked_and_paginated(self):
+        in_content = self.create_post('오늘의 질문', '여행 가고 싶은 곳 있나요')
+        in_title = self.create_post('여행 추천해 주세요', '어디든 좋아요')
+
+        self.assertEqual([p['id'] for p in self.search('여행')], [in_title.id, in_content.id])
+        self.assertEqual([p['id'] for p in self.search('여행', pageSize=1, pageNum=2)], [in_content.id])
+
+        expected = SimplePostSerializer(Post.objects.with_is_liked(self.user).get(id=in_title.id), user_id=self.user).data
+        self.assertEqual(self.search('여행')[0], json.loads(json.dumps(expected)))
+
+    def test_index_follows_edit_hide_and_delete(self):
+        post = self.create_post('강아지 산책', '매일 산책해요')
+
+        post.title = '고양이 자랑'
+        post.save(update_fields=['title', 'update_at'])
+        self.assertEqual(self.search('강아지'), [])
+        self.assertEqual(len(self.search('고양이')), 1)
+
+        Post.objects.filter(id=post.id).update(hidden=True)
+        self.assertEqual(self.search('고양이'), [])
+
+        post.delete()
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT count(*) FROM post_search')
+            self.assertEqual(cursor.fetchone()[0], 0)
+
+    def test_empty_query_is_rejected(self):
+        self.assertEqual(self.client.get('/boards/posts/search/', {'q': ' !? '}).status_code, 400)
+
+
+class FeedCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.users = [User.objects.create_user(nickname=f'reader{i}') for i in range(2)]
+        self.boards = [Board.objects.create(index=i, category=f'board{i}') for i in range(2)]
+        self.topic = Hashtag.objects.create(text='topic')
+        self.posts = [self.create_post(self.boards[i % 2], f'post{i}') for i in range(6)]
+        LikePostAssoc.objects.create(user_id=self.users[1], post_id=self.posts[4])
+
+    def create_post(self, board, title):
+        return Post.objects.create(board_id=board, hashtag_id=self.topic, user_id=self.users[0], mbti='ENTP', title=title, content='content')
+
+    def feed(self, user, **params):
+        client = APIClient()
+        client.force_authenticate(user)
+        res = client.get('/boards/posts/', {'category': 'board0', 'pageSize': 10, **params})
+        self.assertEqual(res.status_code, 200)
+        return res.json()['data']
+
+    def test_cached_page_is_shared_and_liked_per_user(self):
+        first = self.feed(self.users[0])
+        self.assertEqual([post['id'] for post in first], [post.id for post in self.posts[4::-2]])
+
+        # only the rows of the cached ids, with is_liked of this user
+        with self.assertNumQueries(1):
+            second = self.feed(self.users[1])
+
+        self.assertEqual([post['id'] for post in second], [post['id'] for post in first])
+        self.assertEqual([post['is_liked'] for post in first], [False, False, False])
+        self.assertEqual([post['is_liked'] for post in second], [True, False, False])
+
+    def test_writes_invalidate_their_board_only(self):
+        self.feed(self.users[0])
+        other = self.create_post(self.boards[1], 'other board')
+        with self.assertNumQueries(1):
+            self.assertNotIn(other.id, [post['id'] for post in self.feed(self.users[0])])
+
+        created = self.create_post(self.boards[0], 'created')
+        self.assertEqual(self.feed(self.users[0])[0]['id'], created.id)
+
+        created.title = 'edited'
+        created.save(update_fields=['title', 'update_at'])
+        self.assertEqual(self.feed(self.users[0])[0]['title'], 'edited')
+
+        created.hidden = True
+        created.save()
+        self.assertNotIn(created.id, [post['id'] for post in self.feed(self.users[0])])
+
+        self.posts[4].delete()
+        self.assertNotIn(self.posts[4].id, [post['id'] for post in self.feed(self.users[0])])
+
+    def test_cursor_pages_are_cached(self):
+        page = self.feed(self.users[0], cursor='', pageSize=2)
+        client = APIClient()
+        client.force_authenticate(self.users[1])
+        with self.assertNumQueries(1):
+            cached = client.get('/boards/posts/', {'category': 'board0', 'pageSize': 2, 'cursor': ''}).json()
+
+        self.assertEqual([post['id'] for post in cached['data']], [post['id'] for post in page])
+        self.assertIsNotNone(cached['next_cursor'])
+
+
+@override_settings(HOT_SCORE_WEIGHTS={'post': 20, 'view': 1, 'like': 10, 'comment': 5}, HOT_SCORE_HALF_LIFE=3600)
+class HotOrderTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(nickname='hot-reader')
+        board = Board.objects.create(index=0, category='board')
+        topic = Hashtag.objects.create(text='topic')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        for i in range(3):
+            res = self.client.put('/boards/posts/', {'category': 'board', 'topic': 'topic', 'mbti': 'INFJ', 'title': f'post{i}', 'content': 'content'}, format='json')
+            self.assertEqual(res.status_code, 201)
+        self.old, self.liked, self.commented = Post.objects.order_by('id')
+
+    def hot(self, post):
+        post.refresh_from_db(fields=['hot'])
+        return post.hot
+
+    def hot_feed(self):
+        return [post['id'] for post in self.client.get('/boards/posts/', {'order': 'hot'}).json()['data']]
+
+    def test_activity_raises_and_decay_lowers_score(self):
+        self.assertEqual(self.hot(self.old), hot_delta(posts=1))
+        Post.objects.filter(id=self.old.id).update(view=1000, like=100)
+
+        self.client.put(f'/boards/posts/{self.liked.id}/like/')
+        self.assertEqual(self.hot(self.liked), hot_delta(posts=1, likes=1))
+
+        for i in range(3):
+            self.client.put(f'/boards/posts/{self.commented.id}/comment/', {'content': 'comment'}, format='json')
+        self.assertEqual(self.hot(self.commented), hot_delta(posts=1, comments=3))
+
+        post_view_buffer.record(self.old.id)
+        post_view_buffer.flush()
+        self.assertEqual(self.hot(self.old), hot_delta(posts=1, views=1))
+
+        # raw counters of the old post are ignored, only recent activity ranks
+        self.assertEqual(self.hot_feed(), [self.commented.id, self.liked.id, self.old.id])
+
+        self.client.delete(f'/boards/posts/{self.liked.id}/like/')
+        self.assertEqual(self.hot(self.liked), hot_delta(posts=1))
+
+        decay_hot_scores(3600)
+        self.assertAlmostEqual(self.hot(self.commented), hot_delta(posts=1, comments=3) / 2)
+
+        decay_hot_scores(3600 * 20)
+        self.assertEqual(self.hot(self.commented), 0)
+
+    def test_decay_covers_time_since_last_run(self):
+        start = timezone.now()
+        with patch('board.hot.timezone.now', return_value=start):
+            # first run only records the time
+            self.assertEqual(decay_hot_scores_since_last_run(), (0, 0.0))
+        self.assertEqual(self.hot(self.old), hot_delta(posts=1))
+
+        # a late run, two half-lives after the previous one
+        with patch('board.hot.timezone.now', return_value=start + timedelta(hours=2)):
+            self.assertEqual(decay_hot_scores_since_last_run(), (3, 7200))
+        self.assertAlmostEqual(self.hot(self.old), hot_delta(posts=1) / 4)
+
+        # runs right after each other decay by the seconds in between
+        with patch('board.hot.timezone.now', return_value=start + timedelta(hours=2, seconds=1)):
+            self.assertEqual(decay_hot_scores_since_last_run(), (3, 1))
+        self.assertAlmostEqual(self.hot(self.old), hot_delta(posts=1) / 4 * decay_factor(1))
+        self.assertEqual(HotScoreDecay.objects.get().decayed_at, start + timedelta(hours=2, seconds=1))
+
+
+class ForMeFeedTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(nickname='author')
+        self.reader = User.objects.create_user(nickname='reader')
+        self.interest = UserInterest.objects.create(user_id=self.reader)
+        self.interest.mbtis.set([MBTIClass.objects.create(mbti='INFP')])
+        self.interest.interests.set([Hashtag.objects.create(text='travel')])
+
+        Board.objects.create(index=0, category='board')
+        Hashtag.objects.create(text='food')
+        self.client = APIClient()
+
+    def write(self, mbti, topic):
+        self.client.force_authenticate(self.author)
+        # the fan out runs on commit
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.put('/boards/posts/', {'category': 'board', 'topic': topic, 'mbti': mbti, 'title': f'{mbti} {topic}', 'content': 'content'}, format='json')
+        self.assertEqual(res.status_code, 201)
+        return res.json()['data']['post_id']
+
+    def for_me(self, queries=None):
+        self.client.force_authenticate(self.reader)
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get('/boards/posts/', {'feed': 'for_me', 'cursor': ''})
+        self.assertEqual(res.status_code, 200)
+
+        # served from the candidate list, not an OR over the user's interests
+        self.assertNotIn(' OR ', ctx.captured_queries[-1]['sql'])
+        if queries is not None:
+            self.assertEqual(len(ctx.captured_queries), queries)
+        return [post['id'] for post in res.json()['data']]
+
+    def test_new_posts_reach_interested_users(self):
+        self.assertEqual(self.for_me(), [])
+
+        by_mbti = self.write('INFP', 'food')
+        by_topic = self.write('ESTJ', 'travel')
+        self.write('ESTJ', 'food')
+
+        # stale mark lookup, page
+        self.assertEqual(self.for_me(queries=2), [by_topic, by_mbti])
+
+    def test_fan_out_waits_for_commit(self):
+        self.client.force_authenticate(self.author)
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.client.put('/boards/posts/', {'category': 'board', 'topic': 'travel', 'mbti': 'INFP', 'title': 'title', 'content': 'content'}, format='json')
+            self.assertFalse(FeedCandidate.objects.exists())
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual(FeedCandidate.objects.filter(user_id=self.reader).count(), 1)
+
+    def test_topic_less_post_matches_by_mbti_only(self):
+        other = User.objects.create_user(nickname='other-reader')
+        UserInterest.objects.create(user_id=other).mbtis.set([MBTIClass.objects.create(mbti='ENFP')])
+
+        board = Board.objects.get(category='board')
+        with self.captureOnCommitCallbacks(execute=True):
+            by_mbti = Post.objects.create(board_id=board, user_id=self.author, mbti='INFP', title='title', content='content')
+            Post.objects.create(board_id=board, user_id=self.author, mbti='ESTJ', title='title', content='content')
+
+        self.assertEqual(list(FeedCandidate.objects.values_list('user_id', 'post_id')), [(self.reader.id, by_mbti.id)])
+
+    @override_settings(FOR_ME_FEED_SIZE=2)
+    def test_candidates_are_pruned_on_insert(self):
+        self.write('INFP', 'food')
+        latest = [self.write('ESTJ', 'travel') for _ in range(2)][::-1]
+
+        self.assertEqual(list(FeedCandidate.objects.filter(user_id=self.reader).order_by('-post_id').values_list('post_id', flat=True)), latest)
+        self.assertEqual(self.for_me(), latest)
+
+    def test_interest_change_rebuilds_candidates(self):
+        by_mbti = self.write('INFP', 'food')
+        by_topic = self.write('ESTJ', 'travel')
+        other = self.write('ESTJ', 'food')
+
+        self.interest.mbtis.clear()
+        self.assertEqual(self.for_me(), [by_topic])
+
+        self.interest.interests.add(Hashtag.objects.get(text='food'))
+        self.assertEqual(self.for_me(), [other, by_topic, by_mbti])
+        # rebuilt once, the stale mark is a row shared by every worker
+        self.assertFalse(StaleFeed.objects.exists())
+        self.assertEqual(self.for_me(queries=2), [other, by_topic, by_mbti])
+
+
+class FanOutWorkerTest(TransactionTestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(nickname='author')
+        self.reader = User.objects.create_user(nickname='reader')
+        UserInterest.objects.create(user_id=self.reader).mbtis.set([MBTIClass.objects.create(mbti='INFP')])
+        self.board = Board.objects.create(index=0, category='board')
+
+    def test_fan_out_runs_off_the_request_thread(self):
+        worker = FanOutWorker()
+        with patch('board.for_me.atexit.register'):
+            worker.start()
+        self.addCleanup(worker.stop)
+
+        threads = []
+
+        def fan_out(*args):
+            threads.append(threading.current_thread().name)
+            fan_out_post(*args)
+
+        with patch('board.for_me.fan_out_worker', worker), patch('board.for_me.fan_out_post', side_effect=fan_out):
+            post = Post.objects.create(board_id=self.board, user_id=self.author, mbti='INFP', title='title', content='content')
+            # queued fan outs run before the thread stops
+            worker.stop()
+
+        self.assertEqual(threads, ['for-me-fan-out'])
+        self.assertEqual(list(FeedCandidate.objects.values_list('user_id', 'post_id')), [(self.reader.id, post.id)])
+
+
+class CommentCountTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(nickname='commenter')
+        Board.objects.create(index=0, category='board')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        res = self.client.put('/boards/posts/', {'category': 'board', 'topic': 'topic', 'mbti': 'INFP', 'title': 'title', 'content': 'content'}, format='json')
+        self.post = Post.objects.get(id=res.json()['data']['post_id'])
+
+    def comment_count(self):
+        self.post.refresh_from_db(fields=['comment_count'])
+        return self.post.comment_count
+
+    def write(self, **body):
+        res = self.client.put(f'/boards/posts/{self.post.id}/comment/', {'content': 'comment', **body}, format='json')
+        self.assertEqual(res.status_code, 200)
+        return res.json()['data']['comment_id']
+
+    def test_comments_and_replies_are_counted(self):
+        self.assertEqual(self.comment_count(), 0)
+
+        comment = self.write()
+        self.write()
+        self.write(parent_comment_id=comment)
+        self.assertEqual(self.comment_count(), 3)
+
+        feed = self.client.get('/boards/posts/', {'cursor': ''}).json()['data']
+        self.assertEqual(feed[0]['comment_count'], 3)
+
+    def test_delete_decrements_once(self):
+        comments = [self.write(), self.write()]
+
+        res = self.client.delete(f'/boards/comments/{comments[0]}/')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(self.comment_count(), 1)
+
+        # deleting the same comment again changes nothing
+        res = self.client.delete(f'/boards/comments/{comments[0]}/')
+        self.assertEqual(res.status_code, 204)
+        self.assertEqual(self.comment_count(), 1)
+
+        self.assertEqual(self.client.delete(f'/boards/comments/{comments[1]}/').status_code, 200)
+        self.assertEqual(self.comment_count(), 0)
+        self.assertEqual(self.client.delete(f'/boards/comments/{comments[1]}/').status_code, 204)
+        self.assertEqual(self.comment_count(), 0)
+
+        self.assertEqual(self.client.delete('/boards/comments/999999/').status_code, 400)
+
+
+class CommentThreadTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(nickname='writer')
+        board = Board.objects.create(index=0, category='board')
+        hashtag = Hashtag.objects.create(text='topic')
+        self.post = Post.objects.create(user_id=self.user, board_id=board, hashtag_id=hashtag, title='title', content='content')
+        self.other_post = Post.objects.create(user_id=self.user, board_id=board, hashtag_id=hashtag, title='other', content='content')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        # post detail views are buffered per post id, which the next test reuses
+        self.addCleanup(post_view_buffer.flush)
+
+    def write(self, parent=None, post=None):
+        body = {'content': 'comment'}
+        if parent is not None:
+            body['parent_comment_id'] = parent
+        res = self.client.put(f'/boards/posts/{(post or self.post).id}/comment/', body, format='json')
+        self.assertEqual(res.status_code, 200)
+        return res.json()['data']['comment_id']
+
+    def test_pages_of_roots_with_their_threads(self):
+        a, b, c = self.write(), self.write(), self.write()
+        a1 = self.write(a)
+        b1 = self.write(b)
+        a1a = self.write(a1)
+        a2 = self.write(a)
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(f'/boards/posts/{self.post.id}/comments/', {'pageSize': 2})
+        self.assertEqual(res.status_code, 200)
+        # the roots of the page, then every reply of those roots in one ordered query
+        self.assertEqual(len(ctx.captured_queries), 2)
+
+        page = res.json()['data']
+        self.assertEqual([comment['comment_id'] for comment in page], [a, a1, a1a, a2, b, b1])
+        self.assertEqual([comment['depth'] for comment in page], [0, 1, 2, 1, 0, 1])
+        self.assertEqual(page[2]['parent_comment_id'], a1)
+
+        res = self.client.get(f'/boards/posts/{self.post.id}/comments/', {'pageSize': 2, 'cursor': res.json()['next_cursor']})
+        self.assertEqual([comment['comment_id'] for comment in res.json()['data']], [c])
+        self.assertIsNone(res.json()['next_cursor'])
+
+        res = self.client.get(f'/boards/posts/{self.post.id}/comments/', {'cursor': 'not a cursor'})
+        self.assertEqual(res.status_code, 400)
+
+    def test_replies_stay_on_the_post_of_their_parent(self):
+        root = self.write()
+        res = self.client.put(f'/boards/posts/{self.other_post.id}/comment/', {'content': 'reply', 'parent_comment_id': root}, format='json')
+        self.assertEqual(res.status_code, 400)
+
+    def test_replies_of_a_hidden_root_are_left_out(self):
+        a, b, c = self.write(), self.write(), self.write()
+        a1, b1 = self.write(a), self.write(b)
+        Comment.objects.filter(id=b).update(hidden=True)
+
+        res = self.client.get(f'/boards/posts/{self.post.id}/comments/', {'pageSize': 1})
+        self.assertEqual([comment['comment_id'] for comment in res.json()['data']], [a, a1])
+        res = self.client.get(f'/boards/posts/{self.post.id}/comments/', {'pageSize': 1, 'cursor': res.json()['next_cursor']})
+        self.assertEqual([comment['comment_id'] for comment in res.json()['data']], [c])
+
+        res = self.client.get(f'/boards/posts/{self.post.id}/comments/')
+        self.assertEqual([comment['comment_id'] for comment in res.json()['data']], [a, a1, c])
+
+    def test_backfill_caps_deep_chains(self):
+        backfill_paths = importlib.import_module('board.migrations.0011_comment_threads').backfill_paths
+        parent = None
+        for _ in range(30):
+            parent = Comment.objects.create(user_id=self.user, post_id=self.post, parent_comment_id=parent, content='reply')
+
+        backfill_paths(django_apps, None)
+
+        chain = list(Comment.objects.filter(post_id=self.post).order_by('id'))
+        self.assertEqual(sorted(chain, key=lambda comment: comment.path), chain)
+        self.assertEqual([comment.depth for comment in chain], [*range(COMMENT_MAX_DEPTH + 1), *[COMMENT_MAX_DEPTH] * 9])
+        self.assertLessEqual(max(len(comment.path) for comment in chain), Comment._meta.get_field('path').max_length)
+
+    @override_settings(COMMENT_PAGE_SIZE=1)
+    def test_post_detail_holds_the_first_page(self):
+        a, b = self.write(), self.write()
+        a1 = self.write(a)
+
+        res = self.client.get(f'/boards/posts/{self.post.id}/')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual([comment['comment_id'] for comment in res.json()['comments']], [a, a1])
+
+        res = self.client.get(f'/boards/posts/{self.post.id}/comments/', {'cursor': res.json()['comments_next_cursor']})
+        self.assertEqual([comment['comment_id'] for comment in res.json()['data']], [b])
+
+
+class PostExcerptTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(nickname='writer')
+        board = Board.objects.create(index=0, category='board')
+        hashtag = Hashtag.objects.create(text='topic')
+        self.post = Post.objects.create(user_id=self.user, board_id=board, hashtag_id=hashtag, mbti='INFP', title='title', content='가' * 80)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_excerpt_follows_content(self):
+        self.assertEqual(self.post.excerpt, '가' * 50)
+
+        res = self.client.post(f'/boards/posts/{self.post.id}/', {'title': 'title', 'content': 'edited content'}, format='json')
+        self.assertEqual(res.status_code, 200)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.excerpt, 'edited content')
+
+    def test_lists_do_not_read_content(self):
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get('/boards/posts/', {'cursor': ''})
+        self.assertEqual(res.json()['data'][0]['short_content'], '가' * 50)
+        self.assertFalse(any('"post"."content"' in query['sql'] for query in ctx.captured_queries))
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.put(f'/boards/posts/{self.post.id}/like/')
+        self.assertEqual(res.status_code, 201)
+        self.assertEqual(res.json()['data']['short_content'], '가' * 50)
+        self.assertFalse(any('"post"."content"' in query['sql'] for query in ctx.captured_queries))
+
+
+class FastSerializerParityTest(TestCase):
+    def setUp(self):
+        self.reader = User.objects.create_user(nickname='reader')
+        self.author = User.objects.create_user(nickname='author', image='user_image/author.png')
+        self.author.mbti = 'ENTP'
+        self.author.save()
+
+        board = Board.objects.create(index=0, category='board')
+        hashtag = Hashtag.objects.create(text='topic')
+        self.posts = [
+            Post.objects.create(user_id=self.author, board_id=board, hashtag_id=hashtag, mbti='ENTP', title='with topic', content='가나다라' * 30),
+            Post.objects.create(user_id=None, board_id=board, hashtag_id=None, mbti='XXXX', title='no topic, no author', content='content'),
+        ]
+        LikePostAssoc.objects.create(user_id=self.reader, post_id=self.posts[0])
+
+        root = Comment.objects.create(user_id=self.author, post_id=self.posts[0], content='root', path='0000000001')
+        reply = Comment.objects.create(user_id=None, post_id=self.posts[0], content='deleted', parent_comment_id=root, depth=1, delete_at=timezone.now())
+        LikeCommentAssoc.objects.create(user_id=self.reader, comment_id=reply)
+
+    def render(self, data):
+        return JSONRenderer().render(data)
+
+    def test_simple_posts(self):
+        posts = Post.objects.with_is_liked(self.reader).order_by('id')
+        expected = SimplePostSerializer(posts.select_related('board_id', 'hashtag_id', 'user_id'), user_id=self.reader, many=True).data
+        self.assertEqual(self.render(serialize_simple_posts(posts.values(*SIMPLE_POST_VALUES))), self.render(expected))
+
+    def test_post_detail(self):
+        posts = Post.objects.with_is_liked(self.reader).filter(id=self.posts[0].id)
+        expected = PostDetailSerializer(posts.select_related('board_id', 'hashtag_id', 'user_id').get(), user_id=self.reader).data
+        self.assertEqual(self.render(serialize_post_detail(posts.values(*POST_DETAIL_VALUES).get())), self.render(expected))
+
+    def test_comments(self):
+        comments = Comment.objects.with_is_liked(self.reader).order_by('id')
+        expected = CommentSerializer(comments.select_related('user_id'), user_id=self.reader, many=True).data
+        self.assertEqual(self.render(serialize_comments(comments.values(*COMMENT_VALUES))), self.render(expected))
+
+
+class FastJSONRendererTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(nickname='reader')
+        board = Board.objects.create(index=0, category='board')
+        hashtag = Hashtag.objects.create(text='topic')
+        self.post = Post.objects.create(user_id=self.user, board_id=board, hashtag_id=hashtag, mbti='INFP', title='제목', content='본문\u2028줄바꿈')
+        Comment.objects.create(user_id=self.user, post_id=self.post, content='댓글', path='0000000001')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.addCleanup(post_view_buffer.flush)
+
+    def test_responses_match_drf_json(self):
+        for url in ('/boards/posts/', f'/boards/posts/{self.post.id}/'):
+            res = self.client.get(url)
+            self.assertEqual(res.status_code, 200)
+            self.assertEqual(res.content, JSONRenderer().render(res.data))
+
+    def test_types_match_drf_json(self):
+        data = {
+            'datetime': timezone.now(),
+            'date': timezone.now().date(),
+            'decimal': Decimal('1.50'),
+            'error': ErrorDetail('잘못된 값', code='invalid'),
+            'separators': 'a\u2028b\u2029c',
+            1: [None, True, 1.5],
+        }
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        with patch('config.renderers.orjson', None):
+            self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_swagger_schema_still_negotiates(self):
+        res = self.client.get('/swagger/', {'format': 'openapi'})
+        self.assertEqual(res.status_code, 200)
+        self.assertIn('/boards/posts/', json.loads(res.content)['paths'])
+
+    def test_parser(self):
+        body = '{"content": "댓글", "parent_comment_id": 1}'.encode()
+        self.assertEqual(FastJSONParser().parse(BytesIO(body)), {'content': '댓글', 'parent_comment_id': 1})
+        with self.assertRaises(ParseError):
+            FastJSONParser().parse(BytesIO(b'{"content": '))
+
+
+class CompactFeedTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(nickname='author', image='user_image/author.png')
+        self.reader = User.objects.create_user(nickname='reader')
+        board = Board.objects.create(index=0, category='board')
+        topics = [Hashtag.objects.create(text='travel'), Hashtag.objects.create(text='food')]
+        for i in range(4):
+            Post.objects.create(user_id=self.author, board_id=board, hashtag_id=topics[i % 2], mbti='INFP', title=f'post {i}', content='content')
+        self.client = APIClient()
+        self.client.force_authenticate(self.reader)
+
+    def test_side_dictionaries_rebuild_the_v1_feed(self):
+        v1 = self.client.get('/boards/posts/', {'cursor': '', 'pageSize': 3}).json()
+        v2 = self.client.get('/boards/v2/posts/', {'cursor': '', 'pageSize': 3}).json()
+
+        self.assertEqual(list(v2['authors']), ['author'])
+        self.assertEqual(len(v2['topics']), 2)
+        rebuilt = [
+            {
+                **post,
+                'category': v2['boards'][str(post['category'])],
+                'topic': v2['topics'][str(post['topic'])],
+                'author': v2['authors'][post['author']],
+            }
+            for post in v2['data']
+        ]
+        self.assertEqual(rebuilt, v1['data'])
+
+        v1 = self.client.get('/boards/posts/', {'cursor': v1['next_cursor'], 'pageSize': 3}).json()
+        v2 = self.client.get('/boards/v2/posts/', {'cursor': v2['next_cursor'], 'pageSize': 3}).json()
+        self.assertEqual([post['id'] for post in v2['data']], [post['id'] for post in v1['data']])
+
+    def test_sparse_fields(self):
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get('/boards/v2/posts/', {'fields': 'title,like', 'order': 'hot', 'cursor': ''})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(list(res.json()), ['data', 'next_cursor'])
+        self.assertEqual([list(post) for post in res.json()['data']], [['id', 'title', 'like']] * 4)
+        # no author, board or topic joins
+        self.assertNotIn('JOIN', ctx.captured_queries[-1]['sql'])
+
+        res = self.client.get('/boards/v2/posts/', {'fields': 'title,password'})
+        self.assertEqual(res.status_code, 400)
+
+
+class BoardTaxonomyTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.board = Board.objects.create(index=0, category='free')
+        BoardHashtagAssoc.objects.create(index=0, board_id=self.board, hashtag_id=Hashtag.objects.create(text='movie'))
+        self.client = APIClient()
+
+    def test_etag_and_not_modified(self):
+        res = self.client.get('/boards/')
+        self.assertEqual(res.status_code, 200)
+        etag = res.headers['ETag']
+        self.assertEqual(res.json()['data'][0]['category'], 'free')
+
+        res = self.client.get('/boards/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, 304)
+        self.assertEqual(res.headers['ETag'], etag)
+
+        self.assertEqual(self.client.get('/boards/', HTTP_IF_NONE_MATCH='"stale"').status_code, 200)
+
+    def test_save_invalidates_taxonomy(self):
+        etag = self.client.get('/boards/').headers['ETag']
+        version = get_taxonomy_version()
+
+        # every worker compares its copy against the version key of the shared cache
+        self.board.category = 'renamed'
+        self.board.save()
+        self.assertGreater(get_taxonomy_version(), version)
+
+        res = self.client.get('/boards/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, 200)
+        self.assertNotEqual(res.headers['ETag'], etag)
+        self.assertEqual(res.json()['data'][0]['category'], 'renamed')
+
+    def test_evicted_version_is_never_reused(self):
+        version = get_taxonomy_version()
+        cache.delete(TAXONOMY_VERSION_KEY)
+        self.assertGreater(get_taxonomy_version(), version)
+
+        version = get_taxonomy_version()
+        cache.delete(TAXONOMY_VERSION_KEY)
+        bump_taxonomy_version()
+        self.assertGreater(get_taxonomy_version(), version)
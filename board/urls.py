@@ -8,7 +8,10 @@ urlpatterns = [
 
     path('posts/<int:post_id>/like/', LikePost.as_view(), name='like_post'),
     path('posts/<int:post_id>/comment/', CommentPost.as_view(), name='comment_post'),
+    path('posts/<int:post_id>/comments/', CommentPost.as_view(), name='comment_list'),
     path('posts/<int:post_id>/report/', ReportPost.as_view(), name='post_report'),
+    path('posts/search/', SearchPost.as_view(), name='post_search'),
+    path('v2/posts/', CompactPostList.as_view(), name='post_list_v2'),
     path('posts/<int:post_id>/', PostDetail.as_view(), name='post_detail'),
     path('posts/', CreateOrGetPost.as_view(), name='create_post_detail'),
 
@@ -1,13 +1,24 @@
 from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import F
 from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from django.utils import timezone
+from django.utils.http import parse_etags
 from rest_framework.permissions import IsAuthenticated
-from rest_framework_simplejwt.authentication import JWTAuthentication
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
+from membership.authentication import ClaimsJWTAuthentication
+from .counters import comment_like_counter, post_like_counter, post_view_buffer
+from .fast_serializers import *
+from .feed_cache import feed_page_key, get_feed_page, set_feed_page
+from .for_me import ensure_feed_candidates
+from .hot import hot_delta
+from .pagination import *
+from .search import search_post_ids, tokenize
 from .serializers import *
+from .taxonomy import get_taxonomy
 
 import re
 import logging
@@ -49,15 +60,20 @@ class BoardList(APIView):
                     }
                 )
             ),
+            304: openapi.Response(description='If-None-Match 의 ETag 와 같음. 변경 없음'),
         }
     )
     def get(self, request):
-        serializer = BoardSerializer(Board.objects.all(), many=True)
-        return Response(data={'data': serializer.data}, status=status.HTTP_200_OK)
+        etag, data = get_taxonomy()
+
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+        return Response(data={'data': data}, status=status.HTTP_200_OK, headers={'ETag': etag})
 
 
 class PostDetail(APIView):
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [ClaimsJWTAuthentication]
     permission_classes = [IsAuthenticated]
 
     @swagger_auto_schema(
@@ -120,10 +136,12 @@ class PostDetail(APIView):
                                         }
                                     ),
                                     'parent_comment_id': openapi.Schema(type=openapi.TYPE_NUMBER),
+                                    'depth': openapi.Schema(type=openapi.TYPE_NUMBER),
                                     'is_liked': openapi.Schema(type=openapi.TYPE_BOOLEAN),
                                 }
                             )
                         ),
+                        'comments_next_cursor': openapi.Schema(type=openapi.TYPE_STRING, description='다음 댓글 페이지 커서. 마지막 페이지면 null'),
                     },
                 )
             ),
@@ -138,27 +156,30 @@ class PostDetail(APIView):
         #TODO Query string 미구현
         """
         try:
-            post = Post.objects.get(id=post_id)
+            post = Post.objects.with_is_liked(request.user).values(*POST_DETAIL_VALUES).get(id=post_id)
         except Exception as e:
             return Response({'msg': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-        if post.hidden:
+        if post['hidden']:
             return Response({'msg': 'This post is hidden'}, status=status.HTTP_204_NO_CONTENT)
 
-        post.view = post.view + 1
-        post.save()
-
-        post_serializer = PostDetailSerializer(post, user_id=request.user, many=False)
+        # buffered; written back as a batched F('view') + n update
+        post['view'] = post['view'] + post_view_buffer.record(post['id'])
+        post_like_counter.overlay_rows([post])
 
-        comment_serializer = CommentSerializer(post.comment_set.filter(hidden=False), user_id=request.user, many=True)
-        data = {**post_serializer.data}
+        # first page of threads, the rest from CommentPost.get
+        comments = Comment.objects.filter(post_id=post['id'], hidden=False).with_is_liked(request.user).values(*COMMENT_VALUES)
+        comments, comments_next_cursor = paginate_comment_threads(comments, None)
+        comment_like_counter.overlay_rows(comments)
+        data = serialize_post_detail(post)
 
-        if post.board_id.category == '매거진':
+        if post['board_id__category'] == '매거진':
             data.update({'thumbnamil': None})
 
         return Response({
             'data': data,
-            'comments': comment_serializer.data,
+            'comments': serialize_comments(comments),
+            'comments_next_cursor': comments_next_cursor,
         }, status=status.HTTP_200_OK)
 
 
@@ -260,10 +281,15 @@ class PostDetail(APIView):
 
         post.title = title
         post.content = content
-        post.like_post_assoc_set.filter().delete()
+        post.like = 0
+
+        with transaction.atomic():
+            post.like_post_assoc_set.filter().delete()
+            post.like_shard_set.all().delete()
+            # only the edited columns, so concurrent counter updates are not overwritten
+            post.save(update_fields=['title', 'content', 'like', 'update_at'])
 
         serializer = PostDetailSerializer(post, user_id=request.user, many=False)
-        post.save()
 
         return Response({'data': serializer.data}, status=status.HTTP_200_OK)
 
@@ -304,8 +330,10 @@ class PostDetail(APIView):
 
 
 class CreateOrGetPost(APIView):
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [ClaimsJWTAuthentication]
     permission_classes = [IsAuthenticated]
+    # columns of the feed rows for board.fast_serializers, plus the cursor key of order=hot
+    feed_values = (*SIMPLE_POST_VALUES, 'hot')
 
     @swagger_auto_schema(
         tags=['글'],
@@ -422,10 +450,10 @@ class CreateOrGetPost(APIView):
             content=content,
             view=0,
             report=0,
+            hot=hot_delta(posts=1),
             hidden=False,
         )
 
-        post.save()
         serializer = PostDetailSerializer(post, user_id=request.user)
         return Response({'data': serializer.data}, status=status.HTTP_201_CREATED)
 
@@ -448,7 +476,7 @@ class CreateOrGetPost(APIView):
             ),
             openapi.Parameter(
                 'order', openapi.IN_QUERY, type=openapi.TYPE_STRING,
-                default='', description='\'like\', \'view\' or \'create\'',
+                default='', description='\'like\', \'view\', \'create\' or \'hot\'. hot: 최근 조회, 좋아요, 댓글이 많은 순',
             ),
             openapi.Parameter(
                 'pageSize', openapi.IN_QUERY, type=openapi.TYPE_NUMBER,
@@ -458,6 +486,14 @@ class CreateOrGetPost(APIView):
                 'pageNum', openapi.IN_QUERY, type=openapi.TYPE_NUMBER,
                 default=1, description='게시글 페이지 번호. 최근에 생성된 데이터가 1 Page',
             ),
+            openapi.Parameter(
+                'cursor', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+                description='커서 페이지네이션. 첫 페이지는 빈 값, 이후 응답의 \'next_cursor\' 값을 전달. 사용 시 pageNum 무시',
+            ),
+            openapi.Parameter(
+                'feed', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+                default='', description='\'for_me\': 관심 MBTI, 관심사에 맞는 글만',
+            ),
         ],
         responses={
             200: openapi.Response(
@@ -498,31 +534,24 @@ class CreateOrGetPost(APIView):
         order
         pageNum
         pageSize
+        cursor
+        feed
         """
-        posts = Post.objects.filter(hidden=False)
+        posts = Post.objects.filter(hidden=False).with_is_liked(request.user).values(*self.feed_values)
 
         mbti = request.GET.get('mbti', None)
         if mbti:
             m = re.match(r'[EeIi][SsNn][TtFf][PpJj]', mbti)
-            if m:
-                mbti = mbti.upper()
-                posts = posts.filter(mbti=mbti)
+            mbti = mbti.upper() if m else None
 
         topic = request.GET.get('topic', None)
-        if topic:
-            topics: list = topic.split(',')
-            hashtags = Hashtag.objects.filter(text__in=topics)
-            posts = posts.filter(hashtag_id__in=hashtags)
+        topics = sorted(set(topic.split(','))) if topic else []
 
         category = request.GET.get('category', None)
-        if category:
-            board = Board.objects.get(category=category, hidden=False)
-            posts = posts.filter(board_id=board)
 
         order = request.GET.get('order', None)
-        if order in ['view', 'like', 'create']:
-            if order == 'create': order = 'create_at'
-            posts = posts.order_by(f'-{order}')
+        if order not in ['view', 'like', 'create', 'hot']:
+            order = None
 
         try:
             page_size = int(request.GET.get('pageSize', '10'))
@@ -530,15 +559,185 @@ class CreateOrGetPost(APIView):
         except Exception as e:
             return Response({'msg': 'pageSize and pageNum MUST be Integer'}, status=status.HTTP_400_BAD_REQUEST)
 
-        post_paginator = Paginator(posts, page_size)  # zero based
-        paged_posts = post_paginator.get_page(page_num)
-        serializer = SimplePostSerializer(paged_posts, user_id=request.user, many=True)
+        cursor = request.GET.get('cursor', None)
+        if cursor is None:
+            page = (page_size, page_num)
+        else:
+            page_size = min(max(page_size, 1), 100)
+            page = (page_size, cursor)
+
+        # personalized pages are not shared
+        for_me = request.GET.get('feed', None) == 'for_me'
+
+        # the page is cached as post ids shared by every user, rows and is_liked are loaded per request
+        page_key = None if for_me else feed_page_key(category, topics, ('cursor' if cursor is not None else 'page', category, topics, mbti, order, *page))
+        cached_page = None if for_me else get_feed_page(page_key)
+
+        if cached_page is not None:
+            post_ids, next_cursor = cached_page
+            posts_by_id = {post['id']: post for post in posts.filter(id__in=post_ids)}
+            paged_posts = [posts_by_id[post_id] for post_id in post_ids if post_id in posts_by_id]
+        else:
+            if for_me:
+                # precomputed from UserInterest, board.for_me
+                ensure_feed_candidates(request.user.pk)
+                posts = posts.filter(feed_candidate_set__user_id=request.user)
+
+            if mbti:
+                posts = posts.filter(mbti=mbti)
+
+            if topics:
+                hashtags = Hashtag.objects.filter(text__in=topics)
+                posts = posts.filter(hashtag_id__in=hashtags)
+
+            if category:
+                board = Board.objects.get(category=category, hidden=False)
+                posts = posts.filter(board_id=board)
+
+            if order:
+                posts = posts.order_by('-create_at' if order == 'create' else f'-{order}')
+
+            if cursor is not None:
+                try:
+                    paged_posts, next_cursor = paginate_by_cursor(posts, CURSOR_ORDER_FIELDS.get(order, 'create_at'), cursor, page_size)
+                except InvalidCursor as e:
+                    return Response({'msg': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            else:
+                post_paginator = Paginator(posts, page_size)  # zero based
+                paged_posts, next_cursor = list(post_paginator.get_page(page_num)), None
+
+            if page_key:
+                set_feed_page(page_key, [post['id'] for post in paged_posts], next_cursor)
+
+        data = self.serialize_feed(paged_posts)
+
+        if cursor is not None:
+            return Response(data={**data, 'next_cursor': next_cursor}, status=status.HTTP_200_OK)
+
+        return Response(data=data, status=status.HTTP_200_OK)
+
+    def serialize_feed(self, rows) -> dict:
+        post_like_counter.overlay_rows(rows)
+        return {'data': serialize_simple_posts(rows)}
+
+
+class CompactPostList(CreateOrGetPost):
+    http_method_names = ['get', 'options']
+
+    @swagger_auto_schema(
+        tags=['글', ],
+        operation_id='post_list_v2_get',
+        operation_summary='글 목록 얻기 v2',
+        operation_description='글 목록 얻기와 같은 필터와 페이지네이션. 글마다 category는 게시판 id, topic은 토픽 id, author는 닉네임이고 '
+                              '실제 값은 boards, topics, authors에 페이지 당 한 번씩 담긴다',
+        manual_parameters=[
+            openapi.Parameter(
+                'fields', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+                default='', description='쉼표로 구분한 글 필드. 빈 값이면 전체. id는 항상 포함. ' + ', '.join(COMPACT_POST_FIELDS),
+            ),
+            openapi.Parameter('category', openapi.IN_QUERY, type=openapi.TYPE_STRING, default=''),
+            openapi.Parameter('topic', openapi.IN_QUERY, type=openapi.TYPE_STRING, default=''),
+            openapi.Parameter('mbti', openapi.IN_QUERY, type=openapi.TYPE_STRING, default=''),
+            openapi.Parameter('order', openapi.IN_QUERY, type=openapi.TYPE_STRING, default=''),
+            openapi.Parameter('pageSize', openapi.IN_QUERY, type=openapi.TYPE_NUMBER, default=10),
+            openapi.Parameter('pageNum', openapi.IN_QUERY, type=openapi.TYPE_NUMBER, default=1),
+            openapi.Parameter('cursor', openapi.IN_QUERY, type=openapi.TYPE_STRING),
+            openapi.Parameter('feed', openapi.IN_QUERY, type=openapi.TYPE_STRING, default=''),
+        ],
+        responses={
+            200: openapi.Response(
+                description='글 목록',
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'data': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Items(type=openapi.TYPE_OBJECT)),
+                        'boards': openapi.Schema(type=openapi.TYPE_OBJECT, description='게시판 id: 게시판 이름'),
+                        'topics': openapi.Schema(type=openapi.TYPE_OBJECT, description='토픽 id: 토픽'),
+                        'authors': openapi.Schema(type=openapi.TYPE_OBJECT, description='닉네임: 작성자'),
+                        'next_cursor': openapi.Schema(type=openapi.TYPE_STRING),
+                    },
+                )
+            ),
+            400: openapi.Response(description='없는 필드, 게시판 혹은 토픽', ),
+        }
+    )
+    def get(self, request):
+        """
+        fields
+        그 외 CreateOrGetPost.get
+        """
+        fields = request.GET.get('fields', None)
+        self.fields = list(dict.fromkeys(fields.split(','))) if fields else list(COMPACT_POST_FIELDS)
+        unknown = [field for field in self.fields if field not in COMPACT_POST_FIELDS]
+        if unknown:
+            return Response({'msg': f'Unknown fields: {",".join(unknown)}'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # only the columns of the selected fields, plus the cursor keys
+        self.feed_values = tuple(dict.fromkeys((*compact_post_values(self.fields), 'create_at', 'view', 'like', 'hot')))
+        return super().get(request)
+
+    def serialize_feed(self, rows) -> dict:
+        if 'like' in self.fields:
+            post_like_counter.overlay_rows(rows)
+        return serialize_compact_posts(rows, self.fields)
+
+
+class SearchPost(APIView):
+    authentication_classes = [ClaimsJWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        tags=['글', ],
+        operation_id='post_search_get',
+        operation_summary='글 검색',
+        operation_description='제목과 본문 검색. 한글은 두 글자 단위로 색인. 모든 검색어를 포함한 글을 관련도 순으로 반환',
+        manual_parameters=[
+            openapi.Parameter(
+                'q', openapi.IN_QUERY, type=openapi.TYPE_STRING, required=True,
+            ),
+            openapi.Parameter(
+                'pageSize', openapi.IN_QUERY, type=openapi.TYPE_NUMBER,
+                default=10, description='한 번에 호출하는 요약 게시글 개수. 최대 Size 100',
+            ),
+            openapi.Parameter(
+                'pageNum', openapi.IN_QUERY, type=openapi.TYPE_NUMBER,
+                default=1, description='검색 결과 페이지 번호',
+            ),
+        ],
+        responses={
+            200: openapi.Response(description='글 목록. 글 목록 얻기와 같은 형식', ),
+            400: openapi.Response(description='검색어 없음', ),
+        }
+    )
+    def get(self, request):
+        """
+        q
+        pageNum
+        pageSize
+        """
+        query = request.GET.get('q', '')
+        if not tokenize(query):
+            return Response({'msg': 'Query string should have "q"'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            page_size = min(max(int(request.GET.get('pageSize', '10')), 1), 100)
+            page_num = max(int(request.GET.get('pageNum', '1')), 1)
+        except Exception as e:
+            return Response({'msg': 'pageSize and pageNum MUST be Integer'}, status=status.HTTP_400_BAD_REQUEST)
+
+        post_ids = search_post_ids(query, offset=(page_num - 1) * page_size, limit=page_size)
+        posts = Post.objects.filter(id__in=post_ids, hidden=False).with_is_liked(request.user).values(*SIMPLE_POST_VALUES)
+
+        # keep the rank order of the index
+        posts_by_id = {post['id']: post for post in posts}
+        ranked_posts = [posts_by_id[post_id] for post_id in post_ids if post_id in posts_by_id]
+        post_like_counter.overlay_rows(ranked_posts)
 
-        return Response(data={'data': serializer.data}, status=status.HTTP_200_OK)
+        return Response(data={'data': serialize_simple_posts(ranked_posts)}, status=status.HTTP_200_OK)
 
 
 class LikePost(APIView):
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [ClaimsJWTAuthentication]
     permission_classes = [IsAuthenticated]
 
     @swagger_auto_schema(
@@ -562,20 +761,21 @@ class LikePost(APIView):
     )
     def put(self, request, post_id):
         try:
-            post = Post.objects.get(id=post_id)
+            post = Post.objects.defer('content').select_related('board_id', 'hashtag_id', 'user_id').get(id=post_id)
         except Exception as e:
             return Response({'msg': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-        liked, created = post.like_post_assoc_set.get_or_create(user_id=request.user)
+        with transaction.atomic():
+            # the unique (user_id, post_id) constraint ignores a second like
+            if not LikePostAssoc.objects.insert_or_ignore(user_id=request.user, post_id=post):
+                return Response({'msg': 'The post is already liked'}, status=status.HTTP_200_OK)
+            post_like_counter.add(post.id, 1)
 
-        if created:
-            post.like += 1
-            post.save()
-            serializer = SimplePostSerializer(post, user_id=request.user)
+        post.refresh_from_db(fields=['like'])
+        post_like_counter.overlay([post])
+        serializer = SimplePostSerializer(post, user_id=request.user)
 
-            return Response({'data': serializer.data}, status=status.HTTP_201_CREATED)
-        else:
-            return Response({'msg': 'The post is already liked'}, status=status.HTTP_200_OK)
+        return Response({'data': serializer.data}, status=status.HTTP_201_CREATED)
 
     @swagger_auto_schema(
         tags=['글', ],
@@ -601,22 +801,23 @@ class LikePost(APIView):
         글 좋아요 취소하기
         """
         try:
-            post = Post.objects.get(id=post_id)
+            post = Post.objects.only('id').get(id=post_id)
         except Exception as e:
             return Response({'msg': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-        try:
-            liked = post.like_post_assoc_set.get(user_id=request.user)
-            liked.delete()
-            post.like -= 1
-            post.save()
-            return Response({}, status=status.HTTP_200_OK)
-        except Exception as e:
-            return Response({'msg': str(e)}, status=status.HTTP_204_NO_CONTENT)
+        with transaction.atomic():
+            deleted, _ = post.like_post_assoc_set.filter(user_id=request.user).delete()
+            if deleted:
+                post_like_counter.add(post.id, -1)
+
+        if not deleted:
+            return Response({'msg': 'NO liked'}, status=status.HTTP_204_NO_CONTENT)
+
+        return Response({}, status=status.HTTP_200_OK)
 
 
 class ReportPost(APIView):
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [ClaimsJWTAuthentication]
     permission_classes = [IsAuthenticated]
 
     @swagger_auto_schema(
@@ -695,7 +896,7 @@ class ReportPost(APIView):
 
 
 class LikeComment(APIView):
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [ClaimsJWTAuthentication]
     permission_classes = [IsAuthenticated]
 
     @swagger_auto_schema(
@@ -726,15 +927,16 @@ class LikeComment(APIView):
         except Exception as e:
             return Response({'msg': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-        liked, created = comment.like_comment_assoc_set.get_or_create(user_id=request.user)
+        with transaction.atomic():
+            # the unique (user_id, comment_id) constraint ignores a second like
+            if not LikeCommentAssoc.objects.insert_or_ignore(user_id=request.user, comment_id=comment):
+                return Response({'msg': 'The comment is already liked'}, status=status.HTTP_200_OK)
+            comment_like_counter.add(comment.id, 1)
 
-        if created:
-            comment.like += 1
-            comment.save()
-            serializer = CommentSerializer(comment, user_id=request.user)
-            return Response({'data': serializer.data}, status=status.HTTP_201_CREATED)
-        else:
-            return Response({'msg': 'The post is already liked'}, status=status.HTTP_200_OK)
+        comment.refresh_from_db(fields=['like'])
+        comment_like_counter.overlay([comment])
+        serializer = CommentSerializer(comment, user_id=request.user)
+        return Response({'data': serializer.data}, status=status.HTTP_201_CREATED)
 
     @swagger_auto_schema(
         tags=['댓글', ],
@@ -765,16 +967,16 @@ class LikeComment(APIView):
             return Response({'msg': 'NOT found comment_id'}, status=status.HTTP_400_BAD_REQUEST)
 
 
-        try:
-            liked = comment.like_comment_assoc_set.get(user_id=request.user)
-            liked.delete()
-            comment.like -= 1
-            comment.save()
+        with transaction.atomic():
+            deleted, _ = comment.like_comment_assoc_set.filter(user_id=request.user).delete()
+            if deleted:
+                comment_like_counter.add(comment.id, -1)
 
-            return Response({}, status=status.HTTP_200_OK)
-        except Exception as e:
+        if not deleted:
             return Response({'msg': 'NO liked'}, status=status.HTTP_204_NO_CONTENT)
 
+        return Response({}, status=status.HTTP_200_OK)
+
 
 class ReportComment(APIView):
     def put(self, request, nickname=None, comment_id=None):
@@ -785,9 +987,50 @@ class ReportComment(APIView):
 
 
 class CommentPost(APIView):
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [ClaimsJWTAuthentication]
     permission_classes = [IsAuthenticated]
 
+    @swagger_auto_schema(
+        tags=['댓글', ],
+        operation_id='comment_post_get',
+        operation_summary='댓글 목록',
+        operation_description='원댓글 pageSize개와 그 대댓글 전체. 대댓글은 원댓글 바로 뒤에 path 순서로 이어지며 depth로 깊이를 표시',
+        manual_parameters=[
+            openapi.Parameter('post_id', openapi.IN_PATH, type=openapi.TYPE_NUMBER),
+            openapi.Parameter(
+                'pageSize', openapi.IN_QUERY, type=openapi.TYPE_NUMBER,
+                default=20, description='한 번에 호출하는 원댓글 개수. 최대 Size 100',
+            ),
+            openapi.Parameter(
+                'cursor', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+                description='첫 페이지는 빈 값, 이후 응답의 \'next_cursor\' 값을 전달',
+            ),
+        ],
+        responses={
+            200: openapi.Response(description='댓글 목록. 글 읽기의 comments와 같은 형식, 다음 페이지는 next_cursor', ),
+            400: openapi.Response(description='', ),
+        }
+    )
+    def get(self, request, post_id):
+        """
+        pageSize
+        cursor
+        """
+        try:
+            page_size = request.GET.get('pageSize', None)
+            page_size = min(max(int(page_size), 1), 100) if page_size is not None else None
+        except Exception as e:
+            return Response({'msg': 'pageSize MUST be Integer'}, status=status.HTTP_400_BAD_REQUEST)
+
+        comments = Comment.objects.filter(post_id=post_id, hidden=False).with_is_liked(request.user).values(*COMMENT_VALUES)
+        try:
+            comments, next_cursor = paginate_comment_threads(comments, request.GET.get('cursor', None), page_size)
+        except InvalidCursor as e:
+            return Response({'msg': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        comment_like_counter.overlay_rows(comments)
+        return Response(data={'data': serialize_comments(comments), 'next_cursor': next_cursor}, status=status.HTTP_200_OK)
+
     @swagger_auto_schema(
         tags=['댓글', ],
         operation_id='comment_post_put',
@@ -843,24 +1086,35 @@ class CommentPost(APIView):
                 parent_comment_id = Comment.objects.get(id=parent_comment_id)
                 if parent_comment_id.delete_at:
                     raise Exception('Parent comment is deleted')
+                if parent_comment_id.post_id_id != post.id:
+                    raise Exception('Parent comment is on another post')
             except Exception as e:
                 return Response({'msg': 'NO parent_comment_id '}, status=status.HTTP_400_BAD_REQUEST)
 
+            if parent_comment_id.depth >= COMMENT_MAX_DEPTH:
+                return Response({'msg': 'Reply is too deep'}, status=status.HTTP_400_BAD_REQUEST)
+
         comment = Comment(
             user_id=request.user,
             content=request.data['content'],
             post_id=post,
             parent_comment_id=parent_comment_id,
+            depth=parent_comment_id.depth + 1 if parent_comment_id else 0,
         )
 
-        comment.save()
+        with transaction.atomic():
+            comment.save()
+            # the path ends with the new id
+            comment.path = comment.build_path()
+            comment.save(update_fields=['path'])
+            Post.objects.filter(id=post.id).update(comment_count=F('comment_count') + 1, hot=F('hot') + hot_delta(comments=1))
         serializer = CommentSerializer(comment, user_id=request.user)
 
         return Response({'data': serializer.data}, status=status.HTTP_200_OK)
 
 
 class CommentDetail(APIView):
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [ClaimsJWTAuthentication]
     permission_classes = [IsAuthenticated]
 
     @swagger_auto_schema(
@@ -907,7 +1161,7 @@ class CommentDetail(APIView):
 
         if content:
             comment.content = content
-            comment.save()
+            comment.save(update_fields=['content'])
         else:
             return Response({'msg': 'NO empty content'}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -947,7 +1201,12 @@ class CommentDetail(APIView):
 
         comment.content = 'deleted'
         comment.delete_at = timezone.now()
-        comment.save()
+
+        with transaction.atomic():
+            # conditional update so concurrent deletes decrement the counter only once
+            deleted = Comment.objects.filter(id=comment.id, delete_at__isnull=True).update(content=comment.content, delete_at=comment.delete_at)
+            if deleted:
+                Post.objects.filter(id=comment.post_id_id, comment_count__gt=0).update(comment_count=F('comment_count') - 1)
 
         serializer = CommentSerializer(comment, user_id=request.user)
 
@@ -14,3 +14,11 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings.local')
 
 application = get_asgi_application()
+
+# periodic write-back of buffered post views, board.counters
+from board.counters import post_view_buffer  # noqa: E402
+# `for_me` fan outs off the request path, board.for_me
+from board.for_me import fan_out_worker  # noqa: E402
+
+post_view_buffer.start()
+fan_out_worker.start()
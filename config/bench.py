@@ -0,0 +1,23 @@
+"""
+Throwaway database for the bench_* management commands, so benchmark rows never reach the real data
+"""
+from contextlib import contextmanager
+
+from django.test.utils import override_settings, setup_databases, teardown_databases
+
+# cached users, profiles and Kakao verifications of the bench must not land in the shared cache
+BENCH_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@contextmanager
+def bench_databases(verbosity: int = 0):
+    """
+    Runs the block against freshly migrated test databases (TEST NAME of each database, test_<NAME> by default),
+    destroyed on exit whatever the block wrote
+    """
+    old_config = setup_databases(verbosity=verbosity, interactive=False, serialized_aliases=set())
+    try:
+        with override_settings(CACHES=BENCH_CACHES):
+            yield
+    finally:
+        teardown_databases(old_config, verbosity=verbosity)
@@ -0,0 +1,70 @@
+"""
+JSON rendering and parsing through orjson, falling back to DRF's stdlib json classes
+when orjson is not installed or cannot encode the data.
+Output is byte for byte what rest_framework.renderers.JSONRenderer writes with the default settings.
+"""
+import codecs
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# dates and times through DRF's encoder for its formats, int keys as strings like json.dumps
+ORJSON_OPTIONS = (orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+
+class FastJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or not self.compact or self.ensure_ascii:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        if data is None:
+            return b''
+
+        # pretty printing, e.g. 'application/json; indent=4'
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=self.encoder_class().default, option=ORJSON_OPTIONS)
+        except orjson.JSONEncodeError as e:
+            # e.g. integers over 64 bits
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # JSONRenderer escapes the line and paragraph separators, JSON stays a javascript subset
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+class FastJSONParser(JSONParser):
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or codecs.lookup(encoding).name != 'utf-8':
+            return super().parse(stream, media_type, parser_context)
+
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as e:
+            raise ParseError('JSON parse error - %s' % str(e))
+
+
+class FirstRendererNegotiation(DefaultContentNegotiation):
+    """
+    A view with a single renderer answers with it, whatever the Accept header.
+    Views with their own renderer lists (the swagger schema) still negotiate.
+    """
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        if len(renderers) > 1:
+            return super().select_renderer(request, renderers, format_suffix)
+        return renderers[0], renderers[0].media_type
@@ -39,8 +39,22 @@ INSTALLED_APPS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'membership.authentication.CachedJWTAuthentication',
     ),
+    # orjson when installed, config.renderers
+    'DEFAULT_RENDERER_CLASSES': (
+        'config.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'config.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
+    # views with a `throttle_scope`, counted per user in the shared cache
+    'DEFAULT_THROTTLE_RATES': {
+        'mbti_batch': '30/minute',
+    },
 }
 REST_USE_JWT = True
 
@@ -50,6 +64,8 @@ SIMPLE_JWT = {
     'ROTATE_REFRESH_TOKENS': True,
     'BLACKLIST_AFTER_ROTATION': False,
     'TOKEN_USER_CLASS': 'membership.User', # 자신의 User 모델 연결
+    'TOKEN_OBTAIN_SERIALIZER': 'membership.authentication.ClaimsTokenObtainPairSerializer', # nickname, mbti, image 클레임 포함
+    'TOKEN_REFRESH_SERIALIZER': 'membership.authentication.ClaimsTokenRefreshSerializer', # 갱신 시 클레임을 현재 프로필로
 }
 
 
@@ -136,6 +152,62 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'membership.User'
 
+# Cache of version keys, feed pages, stale marks, user and profile caches.
+# Redis when REDIS_URL is set, shared by every worker; else a per-process memory cache, for a single worker only
+REDIS_URL = os.environ.get('REDIS_URL', None)
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'OPTIONS': {'MAX_ENTRIES': 100000},
+        }
+    }
+
+# Kakao OAuth upstream (membership.kakao)
+KAKAO_API_HOST = 'https://kapi.kakao.com'
+KAKAO_AUTH_HOST = 'https://kauth.kakao.com'
+KAKAO_CONNECT_TIMEOUT = 1.5  # seconds
+KAKAO_READ_TIMEOUT = 3  # seconds
+KAKAO_RETRIES = 2
+KAKAO_POOL_SIZE = 10  # keep-alive connections per host
+KAKAO_ASYNC_POOL_SIZE = 200  # connections of the async login path (ASGI)
+KAKAO_VERIFY_CACHE_TTL = 60  # seconds a verified access token skips the upstream call
+
+# Post.view write-behind buffer (board.counters)
+POST_VIEW_FLUSH_INTERVAL = 10  # seconds between write-backs of each worker, idle or not
+POST_VIEW_MAX_PENDING = 1000  # buffered posts before an early flush
+
+# `order=hot` score (board.hot), decayed by `manage.py decay_hot_scores`
+HOT_SCORE_WEIGHTS = {'post': 20, 'view': 1, 'like': 10, 'comment': 5}  # score per new post, view, like, comment
+HOT_SCORE_HALF_LIFE = 6 * 60 * 60  # seconds for a score to halve
+HOT_SCORE_FLOOR = 0.01  # decayed below this, a score is reset to 0
+
+# `for_me` feed candidates per user (board.for_me), rebuilt by `manage.py rebuild_for_me_feeds`
+FOR_ME_FEED_SIZE = 500  # latest matching posts kept per user, older ones pruned as new posts arrive
+
+# Feed page cache (board.feed_cache), dropped early when a post of the board or topic changes
+FEED_CACHE_TTL = 60  # seconds; bounds how stale view/like ordered pages get
+
+# Comment threads (board.pagination.paginate_comment_threads)
+COMMENT_PAGE_SIZE = 20  # root comments, with all their replies, per page and in the post detail
+
+# Sharded Post.like / Comment.like (board.counters), folded back by `manage.py fold_like_shards`
+LIKE_COUNTER_SHARDS = 0  # slots per post/comment, 0 updates the row directly
+
+# Compiled MBTI test (mbti.scoring)
+MBTI_SCORING_CHECK_INTERVAL = 5  # seconds a process scores with its model before checking the shared version
+
+# Authenticated user cache (membership.authentication)
+AUTH_USER_CACHE_TTL = 30  # seconds a User row is reused, dropped early when the user is saved
+PROFILE_CACHE_TTL = 300  # seconds a built UserProfile response is reused
+
 
 LOGGING = {
     'version': 1,
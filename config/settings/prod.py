@@ -3,6 +3,13 @@ from .base import *
 SECRET_KEY = os.environ.get('DJANGO_SECRET_KEY', None)
 
 ALLOWED_HOSTS = ['*', ]
+
+# JSON only: no browsable API, no Accept header negotiation
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    'DEFAULT_RENDERER_CLASSES': ('config.renderers.FastJSONRenderer', ),
+    'DEFAULT_CONTENT_NEGOTIATION_CLASS': 'config.renderers.FirstRendererNegotiation',
+}
 # DEBUG = False
 DEBUG = True
 KAKAO_OAUTH_CLIENT_ID = os.environ.get('KAKAO_OAUTH_CLIENT_ID', None)
@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class MBTIConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'mbti'
+
+    def ready(self):
+        from django.db.models.signals import post_delete, post_save
+        from mbti.models import MBTIQuestion, MBTITestThreshold
+        from mbti.scoring import bump_scoring_model_version
+
+        for model in (MBTIQuestion, MBTITestThreshold):
+            post_save.connect(bump_scoring_model_version, sender=model, dispatch_uid=f'scoring_save_{model.__name__}')
+            post_delete.connect(bump_scoring_model_version, sender=model, dispatch_uid=f'scoring_delete_{model.__name__}')
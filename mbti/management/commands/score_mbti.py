@@ -0,0 +1,51 @@
+import json
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from mbti.scoring import InvalidAnswers, get_scoring_model
+
+
+class Command(BaseCommand):
+    help = 'Score MBTI answer arrays read as NDJSON (one JSON array per line) and write one result per line'
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', nargs='?', default='-', help='NDJSON file of answer arrays. \'-\' reads stdin')
+        parser.add_argument('--chunk-size', type=int, default=10000, help='Answer arrays scored per matrix operation')
+
+    def handle(self, *args, **options):
+        model = get_scoring_model()
+        source = sys.stdin if options['input'] == '-' else open(options['input'], encoding='utf-8')
+
+        scored = 0
+        chunk = []
+        try:
+            for line_number, line in enumerate(source, start=1):
+                if not line.strip():
+                    continue
+
+                try:
+                    chunk.append(json.loads(line))
+                except ValueError as e:
+                    raise CommandError(f'line {line_number}: {e}')
+
+                if len(chunk) >= options['chunk_size']:
+                    scored += self.write(model, chunk, line_number)
+                    chunk = []
+
+            if chunk:
+                scored += self.write(model, chunk, line_number)
+        finally:
+            if source is not sys.stdin:
+                source.close()
+
+        self.stderr.write(self.style.SUCCESS(f'Scored {scored} answer arrays'))
+
+    def write(self, model, chunk, line_number):
+        try:
+            results = model.results(model.score_many(chunk))
+        except InvalidAnswers as e:
+            raise CommandError(f'chunk ending at line {line_number}: {e}')
+
+        self.stdout.write('\n'.join(json.dumps(result, ensure_ascii=False) for result in results))
+        return len(results)
@@ -0,0 +1,138 @@
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+from mbti.models import MBTIQuestion, MBTITestThreshold
+
+SCORING_MODEL_VERSION_KEY = 'mbti:scoring:version'
+
+CATEGORIES = ('energy', 'information', 'decision', 'lifestyle')
+# (below threshold, at or above threshold) per category
+LETTERS = (('I', 'E'), ('S', 'N'), ('T', 'F'), ('P', 'J'))
+CHOICES = 4
+
+
+class InvalidAnswers(ValueError):
+    pass
+
+
+class MBTIScoringModel:
+    """
+    MBTI test compiled into arrays
+
+    scores:    (questions, choices) score of each answer
+    category:  (questions, categories) one-hot category of each question
+    threshold: (categories, ) E/N/F/J threshold (inclusive)
+    max_score: (categories, ) max score per category
+    """
+
+    def __init__(self, questions, threshold: MBTITestThreshold):
+        if threshold is None:
+            raise Exception('MBTI test threshold is NOT set')
+
+        self.scores = np.array(
+            [[q.select0_score, q.select1_score, q.select2_score, q.select3_score] for q in questions],
+            dtype=np.int64,
+        ).reshape(-1, CHOICES)
+        self.category = np.zeros((len(self.scores), len(CATEGORIES)), dtype=np.int64)
+        self.category[np.arange(len(self.scores)), [CATEGORIES.index(q.category) for q in questions]] = 1
+        self.threshold = np.array([getattr(threshold, c) for c in CATEGORIES], dtype=np.int64)
+        self.max_score = np.maximum(self.scores[:, 0], self.scores[:, CHOICES - 1]) @ self.category
+
+    @classmethod
+    def load(cls):
+        return cls(list(MBTIQuestion.objects.all()), MBTITestThreshold.objects.first())
+
+    def score_many(self, answers) -> np.ndarray:
+        """
+        Category scores of many answer vectors, (submissions, questions) -> (submissions, categories)
+        """
+        try:
+            answers = np.asarray(answers)
+        except (TypeError, ValueError) as e:
+            raise InvalidAnswers('\'answers\' MUST be lists of integers with the same length')
+
+        # floats would be truncated and booleans read as 0/1, only integer arrays are scored
+        if answers.size and answers.dtype.kind not in 'iu':
+            raise InvalidAnswers('\'answers\' MUST be lists of integers with the same length')
+
+        if answers.ndim != 2 or answers.shape[1] != len(self.scores):
+            raise InvalidAnswers('Number of \'answers\' NOT match')
+
+        if answers.size and (answers.min() < 0 or answers.max() >= CHOICES):
+            raise InvalidAnswers(f'\'answers\' MUST be in 0 ~ {CHOICES - 1}')
+
+        answers = answers.astype(np.int64)
+
+        # gather the chosen score of every question, then sum per category
+        chosen = self.scores[np.arange(len(self.scores)), answers]
+        return chosen @ self.category
+
+    def results(self, totals: np.ndarray) -> list:
+        """
+        Category scores -> `_MBTITest` result dicts
+        """
+        suffixes = [f",{t},{m}" for t, m in zip(self.threshold.tolist(), self.max_score.tolist())]
+        above = totals >= self.threshold
+
+        results = []
+        for row, flags in zip(totals.tolist(), above.tolist()):
+            results.append({
+                'score': {category: f"{row[i]}{suffixes[i]}" for i, category in enumerate(CATEGORIES)},
+                'mbti': ''.join(LETTERS[i][flag] for i, flag in enumerate(flags)),
+            })
+        return results
+
+    def score(self, answers) -> dict:
+        return self.results(self.score_many([answers]))[0]
+
+
+_lock = threading.Lock()
+_model = (None, None, 0.0)  # (version, MBTIScoringModel, time.monotonic() of the last version check)
+
+
+def get_scoring_model_version() -> int:
+    # a clock value, so a version key lost to eviction never comes back as an older version
+    return cache.get_or_set(SCORING_MODEL_VERSION_KEY, time.time_ns, timeout=None)
+
+
+def bump_scoring_model_version(**kwargs):
+    """
+    Signal receiver. Question or threshold changed, this process rebuilds its model on the next call,
+    the others within MBTI_SCORING_CHECK_INTERVAL.
+    """
+    global _model
+
+    try:
+        cache.incr(SCORING_MODEL_VERSION_KEY)
+    except ValueError:
+        cache.set(SCORING_MODEL_VERSION_KEY, time.time_ns(), timeout=None)
+    _model = (None, None, 0.0)
+
+
+def get_scoring_model() -> MBTIScoringModel:
+    """
+    The model of this process. Scoring reads neither the database nor the cache,
+    the shared version is checked once per MBTI_SCORING_CHECK_INTERVAL.
+    """
+    global _model
+
+    version, model, checked_at = _model
+    if model is not None and time.monotonic() - checked_at < settings.MBTI_SCORING_CHECK_INTERVAL:
+        return model
+
+    with _lock:
+        version, model, checked_at = _model
+        if model is not None and time.monotonic() - checked_at < settings.MBTI_SCORING_CHECK_INTERVAL:
+            return model
+
+        # read before loading, a change during the load is caught by the next check
+        current_version = get_scoring_model_version()
+        if model is None or version != current_version:
+            model = MBTIScoringModel.load()
+        _model = (current_version, model, time.monotonic())
+
+        return model
@@ -1,6 +1,19 @@
-from django.test import TestCase
+import json
+import random
+import tempfile
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from rest_framework.throttling import ScopedRateThrottle
 
 from mbti.models import MBTIQuestion, MBTITestThreshold
+from mbti.scoring import SCORING_MODEL_VERSION_KEY, get_scoring_model, get_scoring_model_version
+from mbti.views import MBTI_TEST_BATCH_MAX
+from membership.models import User
 
 
 # Create your tests here.
@@ -28,10 +41,10 @@ def testMBTI(answers):
 
     result = {
         'score': {
-            'energy': f"{score['energy']}/{threshold.energy}/{max_score['energy']}",
-            'information': f"{score['information']}/{threshold.information}/{max_score['information']}",
-            'decision': f"{score['decision']}/{threshold.decision}/{max_score['decision']}",
-            'lifestyle': f"{score['lifestyle']}/{threshold.lifestyle}/{max_score['lifestyle']}",
+            'energy': f"{score['energy']},{threshold.energy},{max_score['energy']}",
+            'information': f"{score['information']},{threshold.information},{max_score['information']}",
+            'decision': f"{score['decision']},{threshold.decision},{max_score['decision']}",
+            'lifestyle': f"{score['lifestyle']},{threshold.lifestyle},{max_score['lifestyle']}",
         },
         'mbti': ''.join(mbti),
     }
@@ -39,4 +52,142 @@ def testMBTI(answers):
     return result
 
 
-print(testMBTI([0]*20))
\ No newline at end of file
+def create_questions():
+    """
+    20 questions, 5 per category, some scored in reverse
+    """
+    categories = ('energy', 'information', 'decision', 'lifestyle')
+    MBTIQuestion.objects.bulk_create([
+        MBTIQuestion(
+            index=i, category=categories[i % 4], text=f'question{i}',
+            **{f'select{k}_score': (3 - k if i % 3 == 0 else k) + i % 2 for k in range(4)},
+        )
+        for i in range(20)
+    ])
+    MBTITestThreshold.objects.create(energy=8, information=9, decision=10, lifestyle=7)
+
+
+class MBTIScoringModelTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        create_questions()
+
+    def test_matches_per_question_loop(self):
+        rng = random.Random(0)
+        answers = [[0] * 20, [3] * 20, [1, 2] * 10] + [[rng.randrange(4) for _ in range(20)] for _ in range(500)]
+
+        model = get_scoring_model()
+        expected = [testMBTI(answer) for answer in answers]
+        self.assertEqual([model.score(answer) for answer in answers], expected)
+        self.assertEqual(model.results(model.score_many(answers)), expected)
+
+    def test_question_change_rebuilds_model(self):
+        model = get_scoring_model()
+        self.assertIs(get_scoring_model(), model)
+
+        question = MBTIQuestion.objects.get(index=0)
+        question.select0_score = 9
+        question.save()
+
+        self.assertIsNot(get_scoring_model(), model)
+        self.assertEqual(get_scoring_model().score([0] * 20), testMBTI([0] * 20))
+
+    def test_other_process_change_is_picked_up_after_check_interval(self):
+        model = get_scoring_model()
+        # bumped by another process, only the shared version moves
+        cache.set(SCORING_MODEL_VERSION_KEY, get_scoring_model_version() + 1, timeout=None)
+        self.assertIs(get_scoring_model(), model)
+
+        with override_settings(MBTI_SCORING_CHECK_INTERVAL=0):
+            self.assertIsNot(get_scoring_model(), model)
+
+    def test_submission_needs_no_query(self):
+        client = APIClient()
+        self.assertEqual(client.post('/mbti/test', {'answers': [0] * 20}, format='json').status_code, 200)
+
+        with self.assertNumQueries(0), patch('mbti.scoring.get_scoring_model_version') as get_version:
+            res = client.post('/mbti/test', {'answers': [1, 2] * 10}, format='json')
+        get_version.assert_not_called()
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json()['data'], testMBTI([1, 2] * 10))
+
+    def test_evicted_version_is_never_reused(self):
+        version = get_scoring_model_version()
+        cache.delete(SCORING_MODEL_VERSION_KEY)
+        self.assertGreater(get_scoring_model_version(), version)
+
+
+class MBTITestBatchTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        create_questions()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(nickname='batch-user'))
+
+    def batch(self, answers):
+        return self.client.post('/mbti/test/batch', {'answers': answers}, format='json')
+
+    def test_scores_in_order(self):
+        answers = [[0] * 20, [3] * 20, [1, 2] * 10]
+        res = self.batch(answers)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json()['data'], [testMBTI(answer) for answer in answers])
+
+        self.assertEqual(self.batch([]).json()['data'], [])
+
+    def test_requires_authentication(self):
+        self.client.force_authenticate(None)
+        self.assertEqual(self.batch([[0] * 20]).status_code, 401)
+
+    def test_invalid_answers_are_rejected(self):
+        res = self.batch([[0] * 20] * (MBTI_TEST_BATCH_MAX + 1))
+        self.assertEqual(res.status_code, 400)
+        self.assertEqual(res.json()['msg'], f"Number of 'answers' MUST be {MBTI_TEST_BATCH_MAX} or less")
+        self.assertEqual(self.batch([[0] * 20] * MBTI_TEST_BATCH_MAX).status_code, 200)
+
+        for answers in (
+            [[1.5] * 20],  # not truncated to 1
+            [[0] * 19 + [2.0]],
+            [[True] * 20],
+            [['1'] * 20],
+            [[0] * 20, [0] * 19],
+            [[4] * 20],
+            [[0] * 21],
+            'answers',
+            None,
+        ):
+            self.assertEqual(self.batch(answers).status_code, 400, answers)
+
+    def test_throttled_per_user(self):
+        with patch.dict(ScopedRateThrottle.THROTTLE_RATES, {'mbti_batch': '2/minute'}):
+            self.assertEqual(self.batch([[0] * 20]).status_code, 200)
+            self.assertEqual(self.batch([[0] * 20]).status_code, 200)
+            self.assertEqual(self.batch([[0] * 20]).status_code, 429)
+
+
+class ScoreMBTICommandTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        create_questions()
+
+    def score(self, lines, **options):
+        with tempfile.NamedTemporaryFile('w', suffix='.ndjson', encoding='utf-8') as source:
+            source.write('\n'.join(lines))
+            source.flush()
+
+            stdout = StringIO()
+            call_command('score_mbti', source.name, stdout=stdout, stderr=StringIO(), **options)
+        return [json.loads(line) for line in stdout.getvalue().splitlines() if line]
+
+    def test_scores_every_line(self):
+        rng = random.Random(1)
+        answers = [[rng.randrange(4) for _ in range(20)] for _ in range(25)]
+
+        results = self.score([json.dumps(answer) for answer in answers] + [''], chunk_size=10)
+        self.assertEqual(results, [testMBTI(answer) for answer in answers])
+
+    def test_invalid_lines_fail(self):
+        with self.assertRaises(CommandError):
+            self.score(['[0, 1'])
+        with self.assertRaises(CommandError):
+            self.score([json.dumps([0.5] * 20)])
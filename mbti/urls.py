@@ -4,5 +4,6 @@ from .views import *
 urlpatterns = [
     path('questions', MBTIQuestionList.as_view(), name='mbti_question'),  # get
     path('test', MBTITest.as_view(), name='mbti_test'),  # post
+    path('test/batch', MBTITestBatch.as_view(), name='mbti_test_batch'),  # post
     path('result', MBTIResult.as_view(), name='mbti_result'),  # post
 ]
\ No newline at end of file
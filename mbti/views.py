@@ -5,50 +5,25 @@ from drf_yasg.utils import swagger_auto_schema
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.throttling import ScopedRateThrottle
 from rest_framework.views import APIView
-from rest_framework_simplejwt.authentication import JWTAuthentication
 
+from mbti.scoring import InvalidAnswers, get_scoring_model
 from mbti.serializers import *
+from membership.authentication import ClaimsJWTAuthentication
 from membership.models import User
 
 
-def _MBTITest(answers: List[int]):
-    questions = MBTIQuestion.objects.all()
-
-    if len(answers) != len(questions):
-        raise Exception('Number of \'answers\' NOT match')
-
-    score = {'energy': 0, 'decision': 0, 'information': 0, 'lifestyle': 0, }
-    max_score = {'energy': 0, 'decision': 0, 'information': 0, 'lifestyle': 0, }
-    for q, a in zip(questions, answers):
-        score[q.category] += getattr(q, f"select{a}_score")
-        max_score[q.category] += max(q.select0_score, q.select3_score)
-
-    threshold = MBTITestThreshold.objects.first()
-
-    mbti = []
+MBTI_TEST_BATCH_MAX = 1000
 
-    mbti.append('I') if score['energy'] < threshold.energy else mbti.append('E')
-    mbti.append('S') if score['information'] < threshold.information else mbti.append('N')
-    mbti.append('T') if score['decision'] < threshold.decision else mbti.append('F')
-    mbti.append('P') if score['lifestyle'] < threshold.lifestyle else mbti.append('J')
 
-    result = {
-        'score': {
-            'energy': f"{score['energy']},{threshold.energy},{max_score['energy']}",
-            'information': f"{score['information']},{threshold.information},{max_score['information']}",
-            'decision': f"{score['decision']},{threshold.decision},{max_score['decision']}",
-            'lifestyle': f"{score['lifestyle']},{threshold.lifestyle},{max_score['lifestyle']}",
-        },
-        'mbti': ''.join(mbti),
-    }
-
-    return result
+def _MBTITest(answers: List[int]):
+    return get_scoring_model().score(answers)
 
 
 class UserMBTI(APIView):
     permission_classes = [IsAuthenticated, ]
-    authentication_classes = [JWTAuthentication, ]
+    authentication_classes = [ClaimsJWTAuthentication, ]
 
     def get(self, request, nickname):
         try:
@@ -110,6 +85,59 @@ class MBTITest(APIView):
             return Response({'msg': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 
+class MBTITestBatch(APIView):
+    permission_classes = [IsAuthenticated, ]
+    authentication_classes = [ClaimsJWTAuthentication, ]
+    throttle_classes = [ScopedRateThrottle, ]
+    throttle_scope = 'mbti_batch'
+
+    @swagger_auto_schema(
+        tags=['MBTI 테스트'],
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            required=['answers'],
+            properties={
+                'answers': openapi.Schema(
+                    type=openapi.TYPE_ARRAY,
+                    description=f'답안 배열의 목록. 최대 {MBTI_TEST_BATCH_MAX}개',
+                    items=openapi.Schema(
+                        type=openapi.TYPE_ARRAY,
+                        items=openapi.Schema(
+                            type=openapi.TYPE_INTEGER
+                        )
+                    )
+                )
+            },
+        ),
+    )
+    def post(self, request):
+        """
+        MBTI Batch Test API
+
+        여러 MBTI 테스트 답안을 한 번에 채점. 결과는 답안 순서와 같음
+        '0: 전혀 아님, 1: 아님, 2: 그렇다, 3: 매우 그렇다'
+        로그인 필요, 사용자별 호출 횟수 제한 (DEFAULT_THROTTLE_RATES 'mbti_batch')
+        """
+        try:
+            answers = request.data['answers']
+        except Exception as e:
+            answers = None
+
+        if not isinstance(answers, list):
+            return Response({'msg': 'request body should be in \'answers\' list'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if len(answers) > MBTI_TEST_BATCH_MAX:
+            return Response({'msg': f'Number of \'answers\' MUST be {MBTI_TEST_BATCH_MAX} or less'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            model = get_scoring_model()
+            results = model.results(model.score_many(answers)) if answers else []
+        except InvalidAnswers as e:
+            return Response({'msg': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({'data': results}, status=status.HTTP_200_OK)
+
+
 class MBTIQuestionList(APIView):
     @swagger_auto_schema(
         tags=['MBTI 테스트'],
@@ -4,3 +4,15 @@ from django.apps import AppConfig
 class MembershipConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'membership'
+
+    def ready(self):
+        from django.db.models.signals import m2m_changed, post_delete, post_save
+        from membership.authentication import invalidate_user_cache
+        from membership.models import User, UserInterest
+        from membership.profile import invalidate_interest_profile, invalidate_user_profile
+
+        post_save.connect(invalidate_user_cache, sender=User, dispatch_uid='auth_save_User')
+        post_delete.connect(invalidate_user_cache, sender=User, dispatch_uid='auth_delete_User')
+        post_save.connect(invalidate_user_profile, sender=User, dispatch_uid='profile_save_User')
+        for through in (UserInterest.mbtis.through, UserInterest.interests.through):
+            m2m_changed.connect(invalidate_interest_profile, sender=through, dispatch_uid=f'profile_m2m_{through.__name__}')
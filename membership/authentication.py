@@ -0,0 +1,137 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+
+from membership.models import User
+
+# User fields copied into the tokens, enough to write posts and render an author without a query
+USER_CLAIMS = ('nickname', 'mbti', 'image')
+# profile version the claims were copied at, see get_profile_version
+PROFILE_VERSION_CLAIM = 'profile_version'
+
+
+def _profile_version_key(user_id) -> str:
+    return f"membership:user:version:{user_id}"
+
+
+def get_profile_version(user_id) -> int:
+    """
+    Version of the user's token claims in the shared cache, moved by every save of the User row.
+    A lost key starts a new version, so no token issued before is trusted.
+    """
+    return cache.get_or_set(_profile_version_key(user_id), time.time_ns, timeout=None)
+
+
+def set_user_claims(token, user: User):
+    token[PROFILE_VERSION_CLAIM] = get_profile_version(user.pk)
+    token['nickname'] = user.nickname
+    token['mbti'] = user.mbti
+    token['image'] = user.image.name if user.image else None
+    return token
+
+
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    @classmethod
+    def get_token(cls, user):
+        return set_user_claims(super().get_token(user), user)
+
+
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Copies the current profile into the refreshed tokens, instead of the claims of the old refresh token
+    """
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        try:
+            user = User.objects.get(**{api_settings.USER_ID_FIELD: refresh[api_settings.USER_ID_CLAIM]})
+        except (KeyError, User.DoesNotExist) as e:
+            raise AuthenticationFailed(self.error_messages['no_active_account'], 'no_active_account')
+
+        # same jti and expiry, the access token and the rotated refresh token copy the new claims
+        return super().validate({**attrs, 'refresh': str(set_user_claims(refresh, user))})
+
+
+class UserCache:
+    """
+    TTL cache of full User rows by id, in the cache shared by every worker process
+    """
+
+    def _key(self, user_id) -> str:
+        return f"membership:user:{user_id}"
+
+    def get(self, user_id):
+        return cache.get(self._key(user_id))
+
+    def set(self, user_id, user: User):
+        cache.set(self._key(user_id), user, timeout=settings.AUTH_USER_CACHE_TTL)
+
+    def invalidate(self, user_id):
+        cache.delete(self._key(user_id))
+
+
+user_cache = UserCache()
+
+
+def invalidate_cached_user(user_id):
+    user_cache.invalidate(str(user_id))
+    # tokens issued before stop being trusted for their claims
+    cache.set(_profile_version_key(user_id), time.time_ns(), timeout=None)
+
+
+def invalidate_user_cache(instance: User, **kwargs):
+    """
+    Signal receiver. User row saved or deleted, every process reloads it.
+    """
+    invalidate_cached_user(instance.pk)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication with the full User row served from the shared TTL cache
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = str(validated_token[api_settings.USER_ID_CLAIM])
+        except KeyError as e:
+            raise InvalidToken('Token contained no recognizable user identification')
+
+        user = user_cache.get(user_id)
+        if user is None:
+            user = super().get_user(validated_token)
+            user_cache.set(user_id, user)
+
+        return user
+
+
+class ClaimsJWTAuthentication(CachedJWTAuthentication):
+    """
+    Builds request.user from the token claims without a query, while they are the user's current profile.
+
+    The user is a User instance holding only id and USER_CLAIMS; every other field is deferred and loaded
+    on first access, and save() writes only the loaded fields.
+    Tokens issued before the last save of the user, or without the claims, fall back to the cached full row.
+    """
+
+    def get_user(self, validated_token):
+        if not all(claim in validated_token for claim in (*USER_CLAIMS, PROFILE_VERSION_CLAIM)):
+            return super().get_user(validated_token)
+
+        try:
+            user_id = int(validated_token[api_settings.USER_ID_CLAIM])
+        except (KeyError, TypeError, ValueError) as e:
+            raise InvalidToken('Token contained no recognizable user identification')
+
+        if cache.get(_profile_version_key(user_id)) != validated_token[PROFILE_VERSION_CLAIM]:
+            return super().get_user(validated_token)
+
+        values = {'id': user_id, **{claim: validated_token[claim] for claim in USER_CLAIMS}}
+        # from_db takes the loaded values in model field order
+        field_names = [f.attname for f in User._meta.concrete_fields if f.attname in values]
+        return User.from_db(User.objects.db, field_names, [values[name] for name in field_names])
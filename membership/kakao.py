@@ -0,0 +1,170 @@
+import asyncio
+import hashlib
+import threading
+import weakref
+
+import httpx
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class KakaoUnavailable(Exception):
+    """
+    Kakao did not answer within the timeout and retry budget
+    """
+    pass
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """
+    Process-wide keep-alive session to the Kakao hosts.
+    Idempotent requests are retried on connection errors and 502/503/504 with a short backoff.
+    """
+    global _session
+
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                retry = Retry(
+                    total=settings.KAKAO_RETRIES,
+                    connect=settings.KAKAO_RETRIES,
+                    read=settings.KAKAO_RETRIES,
+                    status=settings.KAKAO_RETRIES,
+                    backoff_factor=0.1,
+                    status_forcelist=(502, 503, 504),
+                    allowed_methods=frozenset(['GET']),
+                    raise_on_status=False,
+                )
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=settings.KAKAO_POOL_SIZE, max_retries=retry)
+
+                session = requests.Session()
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _session = session
+
+    return _session
+
+
+def _token_cache_key(kakao_access_token: str) -> str:
+    return f"kakao:me:{hashlib.sha256(kakao_access_token.encode()).hexdigest()}"
+
+
+def get_kakao_user(kakao_access_token: str):
+    """
+    Verify a kakao access token. Returns the kakao user resource, or None when Kakao rejects the token.
+    Verified tokens are cached for KAKAO_VERIFY_CACHE_TTL seconds, keyed by a hash of the token.
+    """
+    key = _token_cache_key(kakao_access_token)
+    kakao_resource = cache.get(key)
+    if kakao_resource is not None:
+        return kakao_resource
+
+    try:
+        res = get_session().get(
+            f"{settings.KAKAO_API_HOST}/v2/user/me",
+            headers={"Authorization": f"Bearer {kakao_access_token}"},
+            timeout=(settings.KAKAO_CONNECT_TIMEOUT, settings.KAKAO_READ_TIMEOUT),
+        )
+    except requests.RequestException as e:
+        raise KakaoUnavailable(str(e))
+
+    if res.status_code >= 500:
+        raise KakaoUnavailable(f'Kakao responded {res.status_code}')
+
+    if res.status_code != 200:
+        return None
+
+    kakao_resource = res.json()
+    if kakao_resource.get('id', None):
+        cache.set(key, kakao_resource, timeout=settings.KAKAO_VERIFY_CACHE_TTL)
+
+    return kakao_resource
+
+
+def exchange_kakao_code(data: dict) -> dict:
+    """
+    Exchange a web login authorization code for kakao tokens. Not retried, a code is single use.
+    """
+    try:
+        res = get_session().post(
+            f"{settings.KAKAO_AUTH_HOST}/oauth/token",
+            data=data,
+            headers={"Content-Type": "application/x-www-form-urlencoded"},
+            timeout=(settings.KAKAO_CONNECT_TIMEOUT, settings.KAKAO_READ_TIMEOUT),
+        )
+    except requests.RequestException as e:
+        raise KakaoUnavailable(str(e))
+
+    if res.status_code >= 500:
+        raise KakaoUnavailable(f'Kakao responded {res.status_code}')
+
+    return res.json()
+
+
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """
+    Keep-alive async client to the Kakao hosts, one per event loop
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = httpx.AsyncClient(
+            timeout=httpx.Timeout(settings.KAKAO_READ_TIMEOUT, connect=settings.KAKAO_CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_connections=settings.KAKAO_ASYNC_POOL_SIZE, max_keepalive_connections=settings.KAKAO_ASYNC_POOL_SIZE),
+        )
+        _async_clients[loop] = client
+
+    return client
+
+
+async def aget_kakao_user(kakao_access_token: str):
+    """
+    Async get_kakao_user. Same cache, timeouts and retry budget.
+    """
+    key = _token_cache_key(kakao_access_token)
+    kakao_resource = await cache.aget(key)
+    if kakao_resource is not None:
+        return kakao_resource
+
+    for attempt in range(settings.KAKAO_RETRIES + 1):
+        if attempt:
+            await asyncio.sleep(0.1 * 2 ** (attempt - 1))
+
+        try:
+            res = await get_async_client().get(
+                f"{settings.KAKAO_API_HOST}/v2/user/me",
+                headers={"Authorization": f"Bearer {kakao_access_token}"},
+            )
+        except httpx.TransportError as e:
+            error = str(e) or e.__class__.__name__
+            continue
+
+        if res.status_code in (502, 503, 504):
+            error = f'Kakao responded {res.status_code}'
+            continue
+
+        break
+    else:
+        raise KakaoUnavailable(error)
+
+    if res.status_code >= 500:
+        raise KakaoUnavailable(f'Kakao responded {res.status_code}')
+
+    if res.status_code != 200:
+        return None
+
+    kakao_resource = res.json()
+    if kakao_resource.get('id', None):
+        await cache.aset(key, kakao_resource, timeout=settings.KAKAO_VERIFY_CACHE_TTL)
+
+    return kakao_resource
@@ -0,0 +1,72 @@
+"""
+Local stand-in for kapi.kakao.com, used by the membership tests and the bench_kakao_login command
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubKakaoHandler(BaseHTTPRequestHandler):
+    """
+    Minimal kapi.kakao.com. The access token picks the behaviour:
+    'valid-*' 200, 'slow-*' 200 after `delay` seconds, 'flaky-*' 503 on the first call, anything else 401.
+    The kakao id is the token itself, so equal tokens sign in the same user.
+    """
+
+    def do_GET(self):
+        server = self.server
+        token = self.headers.get('Authorization', '').removeprefix('Bearer ')
+
+        with server.lock:
+            server.hits[token] = server.hits.get(token, 0) + 1
+            hits = server.hits[token]
+
+        if token.startswith('slow-'):
+            time.sleep(server.delay)
+
+        if token.startswith('flaky-') and hits == 1:
+            return self.reply(503, {})
+
+        if token.startswith(('valid-', 'flaky-', 'slow-')):
+            return self.reply(200, {'id': token})
+
+        return self.reply(401, {'msg': 'this access token does not exist'})
+
+    def reply(self, code, body):
+        payload = json.dumps(body).encode()
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubKakaoServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+    def __init__(self, delay=0.5):
+        super().__init__(('127.0.0.1', 0), StubKakaoHandler)
+        self.delay = delay
+        self.hits = {}
+        self.lock = threading.Lock()
+
+    def handle_error(self, request, client_address):
+        # the client gave up on a slow response
+        pass
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server_address[1]}'
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,48 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from config.bench import bench_databases
+from membership.kakao_stub import StubKakaoServer
+from membership.views import acommon_sign_in_progress, common_sign_in_progress
+
+
+class Command(BaseCommand):
+    help = 'Compare sync and async Kakao login throughput against a local Kakao stub that answers after --delay seconds'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logins', type=int, default=200, help='Logins per run')
+        parser.add_argument('--delay', type=float, default=0.2, help='Kakao stub latency in seconds')
+        parser.add_argument('--workers', type=int, default=4, help='Sync workers (gunicorn sync worker count)')
+
+    def handle(self, *args, **options):
+        tokens = [f'slow-bench-{i}' for i in range(options['logins'])]
+
+        with bench_databases(), StubKakaoServer(delay=0) as kakao, override_settings(
+            KAKAO_API_HOST=kakao.url, KAKAO_READ_TIMEOUT=options['delay'] + 5, KAKAO_VERIFY_CACHE_TTL=0,
+        ):
+            # sign the bench users up first, so both runs measure returning-user logins
+            for token in tokens:
+                common_sign_in_progress(token)
+
+            kakao.delay = options['delay']
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+                list(executor.map(common_sign_in_progress, tokens))
+            sync_elapsed = time.perf_counter() - started
+
+            started = time.perf_counter()
+            asyncio.run(self.async_logins(tokens))
+            async_elapsed = time.perf_counter() - started
+
+        logins = options['logins']
+        self.stdout.write(f"{logins} logins, Kakao latency {options['delay']}s")
+        self.stdout.write(f"sync  ({options['workers']} workers): {sync_elapsed:.2f}s, {logins / sync_elapsed:.1f} logins/s")
+        self.stdout.write(f"async (1 event loop): {async_elapsed:.2f}s, {logins / async_elapsed:.1f} logins/s")
+
+    async def async_logins(self, tokens):
+        await asyncio.gather(*[acommon_sign_in_progress(token) for token in tokens])
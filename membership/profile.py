@@ -0,0 +1,67 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import CharField, Value
+
+from membership.models import User, UserInterest
+from membership.serializers import UserProfileSerializer
+
+
+def _profile_cache_key(user_id) -> str:
+    return f"membership:profile:{user_id}"
+
+
+def build_profile(user: User) -> dict:
+    """
+    `UserProfile.get` body. Interest mbtis and interests are read from both M2M tables in one UNION query.
+    """
+    mbtis = UserInterest.mbtis.through.objects.filter(userinterest__user_id=user.pk).values_list(
+        Value('mbti', output_field=CharField()), 'mbticlass__mbti',
+    )
+    interests = UserInterest.interests.through.objects.filter(userinterest__user_id=user.pk).values_list(
+        Value('interest', output_field=CharField()), 'hashtag__text',
+    )
+
+    profile = {**UserProfileSerializer(user).data, 'interest_mbtis': [], 'interests': []}
+    for kind, value in mbtis.union(interests, all=True):
+        profile['interest_mbtis' if kind == 'mbti' else 'interests'].append(value)
+
+    return profile
+
+
+def get_profile(user: User) -> dict:
+    """
+    Profile of `user`, cached until the user or its interests change
+    """
+    key = _profile_cache_key(user.pk)
+    profile = cache.get(key)
+    if profile is None:
+        profile = build_profile(user)
+        cache.set(key, profile, timeout=settings.PROFILE_CACHE_TTL)
+
+    return profile
+
+
+def invalidate_profile(user_id):
+    cache.delete(_profile_cache_key(user_id))
+
+
+def invalidate_user_profile(instance: User, **kwargs):
+    """
+    Signal receiver. User row saved.
+    """
+    invalidate_profile(instance.pk)
+
+
+def invalidate_interest_profile(instance, action: str, reverse: bool, pk_set, **kwargs):
+    """
+    Signal receiver. UserInterest mbtis or interests changed.
+    """
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        invalidate_profile(instance.user_id_id)
+    elif pk_set:
+        # changed from the MBTIClass / Hashtag side, pk_set are UserInterest ids
+        user_ids = UserInterest.objects.filter(id__in=pk_set).values_list('user_id', flat=True)
+        cache.delete_many([_profile_cache_key(user_id) for user_id in user_ids])
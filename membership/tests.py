@@ -1,3 +1,293 @@
-from django.test import TestCase
+import time
+from unittest.mock import patch
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from membership.authentication import CachedJWTAuthentication, ClaimsJWTAuthentication, user_cache
+from membership.kakao_stub import StubKakaoServer
+from board.models import Board, StaleFeed
+from hashtag.models import Hashtag
+from mbti.models import MBTIClass
+from membership.models import *
+from membership.profile import _profile_cache_key
+from membership.views import _fresh_nickname, _sign_in_result
+
+
+class KakaoLoginTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.kakao = StubKakaoServer().__enter__()
+        cls.settings_override = override_settings(
+            KAKAO_API_HOST=cls.kakao.url, KAKAO_READ_TIMEOUT=0.2, KAKAO_RETRIES=1, KAKAO_VERIFY_CACHE_TTL=60,
+        )
+        cls.settings_override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings_override.disable()
+        cls.kakao.__exit__()
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def login(self, token):
+        return self.client.post('/users/login/kakao/', {'access_token': token}, format='json')
+
+    def test_login_creates_user_and_caches_verification(self):
+        res = self.login('valid-first')
+        self.assertEqual(res.status_code, 200)
+        self.assertIn('access_token', res.json())
+        self.assertTrue(OpenAuth.objects.filter(user_id__nickname=res.json()['nickname']).exists())
+
+        self.assertEqual(self.login('valid-first').status_code, 200)
+        self.assertEqual(self.kakao.hits['valid-first'], 1)
+
+    def statements(self, token):
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.login(token).status_code, 200)
+
+        statements = [query['sql'].split()[0] for query in ctx.captured_queries]
+        return {verb: statements.count(verb) for verb in ('SELECT', 'INSERT', 'UPDATE', 'DELETE')}
+
+    def test_sign_up_and_sign_in_query_count(self):
+        # new user: look up, then user, interest and oauth rows in one transaction
+        self.assertEqual(self.statements('valid-new'), {'SELECT': 1, 'INSERT': 3, 'UPDATE': 0, 'DELETE': 0})
+        # returning user: a single joined look up
+        self.assertEqual(self.statements('valid-new'), {'SELECT': 1, 'INSERT': 0, 'UPDATE': 0, 'DELETE': 0})
+
+    def test_sign_up_is_atomic(self):
+        with patch.object(UserInterest.objects, 'create', side_effect=RuntimeError('crash')):
+            with self.assertRaises(RuntimeError):
+                self.login('valid-crash')
+
+        self.assertFalse(User.objects.filter(nickname='kvalid-crash').exists())
+        self.assertFalse(OpenAuth.objects.filter(kakao='kvalid-crash').exists())
+
+    def test_orphaned_open_auth_is_reused(self):
+        OpenAuth.objects.create(kakao='kvalid-orphan')
+
+        res = self.login('valid-orphan')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(OpenAuth.objects.get(kakao='kvalid-orphan').user_id.nickname, 'kvalid-orphan')
+
+    def test_taken_nickname_gets_a_fresh_one(self):
+        User.objects.create_user(nickname='kvalid-tk')
+
+        res = self.login('valid-tk')
+        self.assertEqual(res.status_code, 200)
+        nickname = res.json()['nickname']
+        self.assertRegex(nickname, r'^kvalid-tk_[0-9a-f]{8}$')
+        self.assertEqual(OpenAuth.objects.get(kakao='kvalid-tk').user_id.nickname, nickname)
+
+        # signed up once, the next login finds the account
+        self.assertEqual(self.login('valid-tk').json()['nickname'], nickname)
+        self.assertEqual(User.objects.filter(nickname__startswith='kvalid-tk').count(), 2)
+
+    def test_fresh_nickname_fits_the_column(self):
+        self.assertEqual(len(_fresh_nickname('k' + '9' * 19)), User._meta.get_field('nickname').max_length)
+
+    def test_rejected_token_is_not_cached(self):
+        self.assertEqual(self.login('expired').status_code, 400)
+        self.assertEqual(self.login('expired').status_code, 400)
+        self.assertEqual(self.kakao.hits['expired'], 2)
+
+    def test_unavailable_upstream_is_retried(self):
+        self.assertEqual(self.login('flaky-once').status_code, 200)
+        self.assertEqual(self.kakao.hits['flaky-once'], 2)
+
+    def test_slow_upstream_times_out(self):
+        started = time.monotonic()
+        res = self.login('slow-token')
+
+        self.assertEqual(res.status_code, 502)
+        # read timeout 0.2s, one retry
+        self.assertLess(time.monotonic() - started, self.kakao.delay * 2)
+
+    async def test_async_login_matches_sync_login(self):
+        res = await self.async_client.post('/users/login/kakao/async/', {'access_token': 'valid-async'}, content_type='application/json')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json()['nickname'], 'kvalid-async')
+        self.assertTrue(await OpenAuth.objects.filter(kakao='kvalid-async', user_id__nickname='kvalid-async').aexists())
+        self.assertTrue(await UserInterest.objects.filter(user_id__nickname='kvalid-async').aexists())
+
+        res = await self.async_client.post('/users/login/kakao/async/', {'access_token': 'expired-async'}, content_type='application/json')
+        self.assertEqual(res.status_code, 400)
+
+        await cache.aclear()
+        res = await self.async_client.post('/users/login/kakao/async/', {'access_token': 'flaky-async'}, content_type='application/json')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(self.kakao.hits['flaky-async'], 2)
+
+        res = await self.async_client.post('/users/login/kakao/async/', {'access_token': 'slow-async'}, content_type='application/json')
+        self.assertEqual(res.status_code, 502)
+
+
+class JWTAuthenticationTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(nickname='jwt-user')
+        self.user.mbti = 'ENFP'
+        self.user.save()
+        UserInterest.objects.create(user_id=self.user)
+
+        self.client = APIClient()
+        self.access_token = _sign_in_result(self.user)['access_token']
+
+    def authenticate(self, authentication, access_token):
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {access_token}')
+        user, token = authentication.authenticate(request)
+        return user
+
+    def test_claims_user_needs_no_query(self):
+        with self.assertNumQueries(0):
+            user = self.authenticate(ClaimsJWTAuthentication(), self.access_token)
+            self.assertEqual((user.pk, user.nickname, user.mbti), (self.user.pk, 'jwt-user', 'ENFP'))
+
+        # other fields are loaded on access
+        with self.assertNumQueries(1):
+            self.assertFalse(user.is_init)
+
+    def test_claims_of_an_edited_user_are_not_trusted(self):
+        User.objects.filter(pk=self.user.pk).update(nickname='jwt-renamed')
+        # any save of the row, e.g. the admin, in any worker
+        User.objects.get(pk=self.user.pk).save()
+
+        with self.assertNumQueries(1):
+            user = self.authenticate(ClaimsJWTAuthentication(), self.access_token)
+        self.assertEqual(user.nickname, 'jwt-renamed')
+
+        # a token issued after the edit carries the new profile
+        with self.assertNumQueries(0):
+            user = self.authenticate(ClaimsJWTAuthentication(), _sign_in_result(user)['access_token'])
+        self.assertEqual(user.nickname, 'jwt-renamed')
+
+    def test_token_without_claims_falls_back_to_cached_row(self):
+        access_token = str(RefreshToken.for_user(self.user).access_token)
+
+        with self.assertNumQueries(1):
+            self.authenticate(ClaimsJWTAuthentication(), access_token)
+        with self.assertNumQueries(0):
+            user = self.authenticate(ClaimsJWTAuthentication(), access_token)
+
+        self.assertEqual(user.nickname, 'jwt-user')
+
+    def test_user_row_is_cached(self):
+        with self.assertNumQueries(1):
+            self.authenticate(CachedJWTAuthentication(), self.access_token)
+        with self.assertNumQueries(0):
+            user = self.authenticate(CachedJWTAuthentication(), self.access_token)
+
+        self.assertEqual((user.nickname, user.mbti), ('jwt-user', 'ENFP'))
+
+    def test_refreshed_token_writes_with_edited_profile(self):
+        refresh_token = _sign_in_result(self.user)['refresh_token']
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.access_token}')
+        res = self.client.post('/users/profile/', {'nickname': 'jwt-renamed', 'mbti': 'INTJ'}, format='json')
+        self.assertEqual(res.status_code, 200)
+
+        res = self.client.post('/users/token/refresh/', {'refresh': refresh_token}, format='json')
+        self.assertEqual(res.status_code, 200)
+        for token in (AccessToken(res.json()['access']), RefreshToken(res.json()['refresh'])):
+            self.assertEqual((token['nickname'], token['mbti']), ('jwt-renamed', 'INTJ'))
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {res.json()['access']}")
+
+        Board.objects.create(index=0, category='board')
+        res = self.client.put('/boards/posts/', {'category': 'board', 'topic': 'topic', 'mbti': 'INTJ', 'title': 'title', 'content': 'content'}, format='json')
+        self.assertEqual(res.status_code, 201)
+        self.assertEqual(res.json()['data']['author']['nickname'], 'jwt-renamed')
+        self.assertEqual(res.json()['data']['author']['mbti'], 'INTJ')
+
+        res = self.client.put(f"/boards/posts/{res.json()['data']['post_id']}/comment/", {'content': 'comment'}, format='json')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json()['data']['author']['nickname'], 'jwt-renamed')
+
+    def test_profile_post_invalidates_cached_user(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.access_token}')
+        self.assertEqual(self.client.get('/users/profile/').status_code, 200)
+        self.assertEqual(self.authenticate(CachedJWTAuthentication(), self.access_token).nickname, 'jwt-user')
+
+        res = self.client.post('/users/profile/', {'nickname': 'jwt-renamed'}, format='json')
+        self.assertEqual(res.status_code, 200)
+
+        self.assertEqual(self.authenticate(CachedJWTAuthentication(), self.access_token).nickname, 'jwt-renamed')
+
+    def test_edits_invalidate_shared_caches(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.access_token}')
+        self.assertEqual(self.client.get('/users/profile/').json()['mbti'], 'ENFP')
+        # cached in the shared cache, not in this process
+        self.assertEqual(user_cache.get(self.user.pk).nickname, 'jwt-user')
+        self.assertEqual(cache.get(_profile_cache_key(self.user.pk))['nickname'], 'jwt-user')
+
+        self.assertEqual(self.client.post('/users/profile/', {'mbti': 'INTJ'}, format='json').status_code, 200)
+        self.assertIsNone(user_cache.get(self.user.pk))
+        self.assertIsNone(cache.get(_profile_cache_key(self.user.pk)))
+        self.assertEqual(self.client.get('/users/profile/').json()['mbti'], 'INTJ')
+
+        # any other save of the row, e.g. the admin
+        User.objects.filter(pk=self.user.pk).get().save()
+        self.assertIsNone(user_cache.get(self.user.pk))
+        self.assertIsNone(cache.get(_profile_cache_key(self.user.pk)))
+
+
+class UserProfileTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(nickname='profile-user')
+        self.interest = UserInterest.objects.create(user_id=self.user)
+        self.interest.mbtis.set([MBTIClass.objects.create(mbti=mbti) for mbti in ('ENFP', 'INTJ')])
+        self.interest.interests.set([Hashtag.objects.create(text=text) for text in ('movie', 'music', 'travel')])
+
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {_sign_in_result(self.user)['access_token']}")
+
+    def get_profile(self):
+        res = self.client.get('/users/profile/')
+        self.assertEqual(res.status_code, 200)
+        return res.json()
+
+    def test_profile_query_budget(self):
+        # user row for the authentication, interests of both M2M tables
+        with self.assertNumQueries(2):
+            profile = self.get_profile()
+
+        self.assertEqual(profile['nickname'], 'profile-user')
+        self.assertCountEqual(profile['interest_mbtis'], ['ENFP', 'INTJ'])
+        self.assertCountEqual(profile['interests'], ['movie', 'music', 'travel'])
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get_profile(), profile)
+
+    def test_profile_is_invalidated(self):
+        self.get_profile()
+        self.assertEqual(self.client.post('/users/profile/', {'nickname': 'profile-renamed'}, format='json').status_code, 200)
+        self.assertEqual(self.get_profile()['nickname'], 'profile-renamed')
+
+        self.interest.interests.remove(Hashtag.objects.get(text='music'))
+        self.assertCountEqual(self.get_profile()['interests'], ['movie', 'travel'])
+
+        self.interest.mbtis.clear()
+        self.assertEqual(self.get_profile()['interest_mbtis'], [])
+
+    def test_interests_are_saved_in_bulk(self):
+        MBTIClass.objects.create(mbti='ISTP')
+        interests = [f'interest-{i}' for i in range(28)] + ['movie', 'music']
+
+        # independent of the number of interests: users (authentication, fresh row joined with its UserInterest),
+        # mbti ids, DELETE and INSERT per M2M, hashtag lookup, INSERT of the new ones and their ids,
+        # one `for_me` stale mark, the user UPDATE
+        with self.assertNumQueries(12):
+            res = self.client.post('/users/profile/', {'interest_mbtis': ['enfp', 'ISTP'], 'interests': interests}, format='json')
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(StaleFeed.objects.filter(user_id=self.user).exists())
+
+        self.assertCountEqual(self.interest.mbtis.values_list('mbti', flat=True), ['ENFP', 'ISTP'])
+        self.assertCountEqual(self.interest.interests.values_list('text', flat=True), interests)
+        self.assertEqual(Hashtag.objects.filter(text__in=interests).count(), 30)
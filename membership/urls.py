@@ -7,6 +7,7 @@ from board.views import *
 # /users/
 urlpatterns = [
     path('login/kakao/', KakaoLoginAuth.as_view(), name='kakao_auth'),
+    path('login/kakao/async/', kakao_login_async, name='kakao_auth_async'),  # ASGI
     path('login/kakao/web/', KakaoLoginWeb.as_view(), name='kakao_web_login'),
     path('login/kakao/web/callback/', KakaoLoginWebCallback.as_view(), name='kakao_web_callback'),
 
@@ -1,19 +1,25 @@
+import json
+import secrets
+
+from asgiref.sync import sync_to_async
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework.permissions import IsAuthenticated
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from django.db import IntegrityError, transaction
+from django.http import JsonResponse
 from django.shortcuts import redirect
 from django.utils import timezone
 from rest_framework import status
 from rest_framework.response import Response
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from rest_framework.views import APIView
-import requests
+from board.for_me import mark_feeds_stale
+from .authentication import CachedJWTAuthentication, ClaimsTokenObtainPairSerializer
+from .kakao import KakaoUnavailable, aget_kakao_user, exchange_kakao_code, get_kakao_user
+from .profile import get_profile
 from .serializers import *
 from django.conf import settings
 
 KAKAO_OAUTH_URI = "https://kauth.kakao.com/oauth/authorize?response_type=code"
-KAKAO_OAUTH_TOKEN_API = "https://kauth.kakao.com/oauth/token"
 KAKAO_OAUTH_CLIENT_ID = settings.KAKAO_OAUTH_CLIENT_ID
 KAKAO_OAUTH_REDIRECT_URI = settings.KAKAO_OAUTH_REDIRECT_URI
 
@@ -22,35 +28,130 @@ def common_sign_in_progress(kakao_access_token:str):
     """
     Verify kakao access token
     """
-    me_url = "https://kapi.kakao.com/v2/user/me"
-    res = requests.get(me_url, headers={
-        "Authorization": f"Bearer {kakao_access_token}"})
+    try:
+        kakao_resource = get_kakao_user(kakao_access_token)
+    except KakaoUnavailable as e:
+        return Response({'msg': 'Kakao is NOT responding'}, status=status.HTTP_502_BAD_GATEWAY)
 
-    if res.status_code != 200:
+    if kakao_resource is None:
         return Response({'msg': 'request body should be in \'access_token\''}, status=status.HTTP_400_BAD_REQUEST)
 
-    kakao_resource = res.json()
-    print(kakao_resource)
-
     kakao_id = kakao_resource.get('id', None)
     if not kakao_id:
         return Response({'msg': 'Invalid kakao access_token'}, status=status.HTTP_400_BAD_REQUEST)
 
-    oa, oa_created = OpenAuth.objects.get_or_create(kakao=f'k{kakao_id}')
-
-    if oa_created:
-        user = User.objects.create_user(nickname=f'k{kakao_id}')
-        user_interest = UserInterest.objects.create(user_id=user)
+    kakao = f'k{kakao_id}'
+    oa = OpenAuth.objects.select_related('user_id').filter(kakao=kakao).first()
 
-        oa.user_id = user
-        oa.kakao_update_at = timezone.now()
-        user_interest.save()
-        user.save()
-        oa.save()
+    if oa is not None and oa.user_id is not None:
+        user = oa.user_id
     else:
+        user = _sign_up_kakao_user(kakao, oa)
+
+    return _sign_in_result(user)
+
+
+async def acommon_sign_in_progress(kakao_access_token: str):
+    """
+    Async common_sign_in_progress for the ASGI login path.
+    Awaits Kakao and the database instead of blocking the worker.
+    """
+    try:
+        kakao_resource = await aget_kakao_user(kakao_access_token)
+    except KakaoUnavailable as e:
+        return JsonResponse({'msg': 'Kakao is NOT responding'}, status=status.HTTP_502_BAD_GATEWAY)
+
+    if kakao_resource is None:
+        return JsonResponse({'msg': 'request body should be in \'access_token\''}, status=status.HTTP_400_BAD_REQUEST)
+
+    kakao_id = kakao_resource.get('id', None)
+    if not kakao_id:
+        return JsonResponse({'msg': 'Invalid kakao access_token'}, status=status.HTTP_400_BAD_REQUEST)
+
+    kakao = f'k{kakao_id}'
+    oa = await OpenAuth.objects.select_related('user_id').filter(kakao=kakao).afirst()
+
+    if oa is not None and oa.user_id is not None:
         user = oa.user_id
+    else:
+        # transactions are sync only
+        user = await sync_to_async(_sign_up_kakao_user)(kakao, oa)
+
+    return _sign_in_result(user)
+
+
+def _sign_up_kakao_user(kakao: str, oa: OpenAuth = None, nickname: str = None) -> User:
+    """
+    First login. User, UserInterest and OpenAuth are inserted in one transaction, one INSERT each.
+    `oa` is an OpenAuth row left without a user by an interrupted sign up, it is reused.
+    The nickname is `kakao`, or `nickname` when another user already holds it.
+    """
+    try:
+        with transaction.atomic():
+            user = User.objects.create_user(nickname=nickname or kakao)
+            UserInterest.objects.create(user_id=user)
+
+            if oa is None:
+                OpenAuth.objects.create(kakao=kakao, user_id=user, kakao_update_at=timezone.now())
+            else:
+                oa.user_id = user
+                oa.kakao_update_at = timezone.now()
+                oa.save(update_fields=['user_id', 'kakao_update_at'])
+    except IntegrityError as e:
+        oa = OpenAuth.objects.select_related('user_id').filter(kakao=kakao).first()
+        if oa is not None and oa.user_id is not None:
+            # a concurrent first login of the same account signed up first
+            return oa.user_id
+
+        if nickname is not None:
+            raise
+
+        # the nickname unique constraint: another user renamed itself to `kakao`
+        return _sign_up_kakao_user(kakao, oa, nickname=_fresh_nickname(kakao))
+
+    return user
+
+
+def _fresh_nickname(kakao: str) -> str:
+    suffix = f"_{secrets.token_hex(4)}"
+    return kakao[:User._meta.get_field('nickname').max_length - len(suffix)] + suffix
+
+
+def _get_or_create_hashtag_ids(texts) -> list:
+    """
+    Hashtag ids of `texts`, missing hashtags are inserted with one bulk INSERT
+    """
+    texts = list(dict.fromkeys(texts))
+    ids = dict(Hashtag.objects.filter(text__in=texts).values_list('text', 'id'))
+
+    missing = [text for text in texts if text not in ids]
+    if missing:
+        # ignore_conflicts: a concurrent request may insert the same text first
+        Hashtag.objects.bulk_create([Hashtag(text=text) for text in missing], ignore_conflicts=True)
+        ids.update(Hashtag.objects.filter(text__in=missing).values_list('text', 'id'))
+
+    return [ids[text] for text in texts]
 
-    token = TokenObtainPairSerializer.get_token(user)
+
+def _set_interests(user_interest: UserInterest, field_name: str, ids):
+    """
+    Replace the `field_name` M2M rows of `user_interest` with `ids`: one DELETE of the others, one INSERT
+    ignoring the kept ones. No m2m_changed is sent, the caller marks the `for_me` feed stale and
+    the User save drops the cached profile.
+    """
+    field = UserInterest._meta.get_field(field_name)
+    through, source, target = field.remote_field.through, field.m2m_field_name(), field.m2m_reverse_field_name()
+
+    ids = list(ids)
+    through.objects.filter(**{source: user_interest}).exclude(**{f'{target}__in': ids}).delete()
+    through.objects.bulk_create(
+        [through(**{f'{source}_id': user_interest.id, f'{target}_id': target_id}) for target_id in ids],
+        ignore_conflicts=True,
+    )
+
+
+def _sign_in_result(user: User):
+    token = ClaimsTokenObtainPairSerializer.get_token(user)
     refresh_token = str(token)
     access_token = str(token.access_token)
 
@@ -62,6 +163,17 @@ def common_sign_in_progress(kakao_access_token:str):
         "refresh_token": refresh_token,
     }
 
+
+def sign_in_response(result):
+    """
+    common_sign_in_progress returns the error Response itself when the login fails
+    """
+    if isinstance(result, Response):
+        return result
+
+    return Response(result, status=status.HTTP_200_OK)
+
+
 class KakaoLoginAuth(APIView):
     @swagger_auto_schema(
         tags=['로그인'],
@@ -112,7 +224,29 @@ class KakaoLoginAuth(APIView):
         if not kakao_access_token:
             return Response({'msg': 'request body NOT include \'access_token\''}, status=status.HTTP_400_BAD_REQUEST)
 
-        return Response(common_sign_in_progress(kakao_access_token=kakao_access_token), status=status.HTTP_200_OK)
+        return sign_in_response(common_sign_in_progress(kakao_access_token=kakao_access_token))
+
+
+async def kakao_login_async(request):
+    """
+    Async KakaoLoginAuth.post. Same body and response, served without holding a worker under an ASGI server.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'msg': 'Method NOT allowed'}, status=status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    try:
+        kakao_access_token = json.loads(request.body)['access_token']
+    except Exception as e:
+        kakao_access_token = None
+
+    if not kakao_access_token:
+        return JsonResponse({'msg': 'request body NOT include \'access_token\''}, status=status.HTTP_400_BAD_REQUEST)
+
+    result = await acommon_sign_in_progress(kakao_access_token=kakao_access_token)
+    if isinstance(result, JsonResponse):
+        return result
+
+    return JsonResponse(result, status=status.HTTP_200_OK)
 
 
 class KakaoLoginWeb(APIView):
@@ -137,17 +271,19 @@ class KakaoLoginWebCallback(APIView):
             "code": request.GET["code"],
         }
 
-        # token_info = requests.post(KAKAO_OAUTH_TOKEN_API, data=data, headers={"Content-Type" : "application/json"}).json()
-        token_info = requests.post(KAKAO_OAUTH_TOKEN_API, data=data, headers={"Content-Type" : "application/x-www-form-urlencoded"}).json()
-        
+        try:
+            token_info = exchange_kakao_code(data)
+        except KakaoUnavailable as e:
+            return Response({'msg': 'Kakao is NOT responding'}, status=status.HTTP_502_BAD_GATEWAY)
+
         kakao_access_token = token_info["access_token"]
-        
-        return Response(common_sign_in_progress(kakao_access_token=kakao_access_token), status=status.HTTP_200_OK)
+
+        return sign_in_response(common_sign_in_progress(kakao_access_token=kakao_access_token))
 
 
 class UserProfile(APIView):
     permission_classes = [IsAuthenticated, ]
-    authentication_classes = [JWTAuthentication, ]
+    authentication_classes = [CachedJWTAuthentication, ]
 
     @swagger_auto_schema(
         tags=['회원 정보'],
@@ -183,13 +319,7 @@ class UserProfile(APIView):
         }
     )
     def get(self, request):
-        user_id: User = request.user
-        serializer = UserProfileSerializer(User.objects.get(nickname=user_id.nickname), many=False)
-        print("user_id : ", user_id)
-        user_interest = UserInterest.objects.get(user_id=user_id)
-        interest_mbtis = user_interest.mbtis.values_list('mbti', flat=True)
-        interests = user_interest.interests.values_list('text', flat=True)
-        return Response(data={**serializer.data, 'interest_mbtis': interest_mbtis, 'interests': interests}, status=status.HTTP_200_OK)
+        return Response(data=get_profile(request.user), status=status.HTTP_200_OK)
 
     @swagger_auto_schema(
         tags=['회원 정보'],
@@ -204,6 +334,8 @@ class UserProfile(APIView):
                 'phone': openapi.Schema(type=openapi.TYPE_STRING),
                 'email': openapi.Schema(type=openapi.TYPE_STRING),
                 'gender': openapi.Schema(type=openapi.TYPE_STRING, description='한글자 [남여]만 허용'),
+                'interest_mbtis': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_STRING), description='관심 MBTI 목록. 보낸 목록으로 교체 됨'),
+                'interests': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_STRING), description='관심사 목록. 보낸 목록으로 교체 되며 없는 해시태그는 생성 됨'),
             },
         ),
         responses={
@@ -228,7 +360,8 @@ class UserProfile(APIView):
         }
     )
     def post(self, request):
-        user: User = request.user
+        # request.user may be the row shared by the authentication cache, edit a fresh one
+        user: User = User.objects.select_related('user_interest').get(pk=request.user.pk)
         update_flag = False
 
         try:
@@ -277,39 +410,31 @@ class UserProfile(APIView):
         except Exception as e:
             pass
 
-        try:
-            user_interest = UserInterest.objects.get(user_id=user)
-
-            interest_mbtis = request.data['interest_mbtis']
+        interests_changed = False
 
-            user_interest.mbtis.clear()
-            for mbti in interest_mbtis:
-                mbti_class = MBTIClass.objects.get(mbit=mbti)
-                user_interest.mbtis.add(mbti_class)
+        try:
+            interest_mbtis = [mbti.upper() for mbti in request.data['interest_mbtis']]
 
-            user_interest.save()
-            update_flag = True
+            _set_interests(user.user_interest, 'mbtis', MBTIClass.objects.filter(mbti__in=interest_mbtis).values_list('id', flat=True))
+            interests_changed = update_flag = True
         except Exception as e:
             pass
 
         try:
-            user_interest = UserInterest.objects.get(user_id=user)
-
             interests_list = request.data['interests']
 
-            user_interest.interests.clear()
-            for interest in interests_list:
-                hashtag, created = Hashtag.objects.get_or_create(text=interest)
-                user_interest.interests.add(hashtag)
-
-            user_interest.save()
-            update_flag = True
+            _set_interests(user.user_interest, 'interests', _get_or_create_hashtag_ids(interests_list))
+            interests_changed = update_flag = True
         except Exception as e:
             pass
 
+        if interests_changed:
+            mark_feeds_stale([user.pk])
+
         if update_flag:
             user.update_at = timezone.now()
 
+        # the User post_save receivers drop the cached user and profile of every process
         user.save()
 
         return Response({}, status=status.HTTP_200_OK)